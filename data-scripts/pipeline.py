@@ -0,0 +1,306 @@
+import os
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import logging
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import preprocess
+from processed import RAW_DIR, PROCESSED_DIR, export_csv_enabled, read_processed
+
+# The ZIP code stage's module name is not a valid identifier
+property_zip = importlib.import_module('propert-assessment_preprocess')
+
+# Configure logging to include timestamps and log levels.
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fingerprints of the stage results of previous runs. The results themselves
+# are the stages' processed outputs.
+CACHE_DIR = os.path.join(PROCESSED_DIR, '.pipeline_cache')
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'manifest.json')
+
+NEIGHBORHOODS_GEOJSON = 'boston-neighborhoods.geojson'
+
+# Preprocessing stages as a DAG. Each stage lists the raw files it reads,
+# the processed files it writes (no two stages write the same file) and the
+# stages whose results it receives as keyword arguments (argument name ->
+# stage). Results that downstream stages receive come back from the stage's
+# Parquet output when the stage is skipped.
+STAGES = {
+    'property': {
+        'func': preprocess.process_property_assessment,
+        'inputs': ['property-assessment-fy2025.csv', NEIGHBORHOODS_GEOJSON],
+        'outputs': ['property-assessment-fy2025_located.parquet'],
+        'deps': {},
+    },
+    'property_zip': {
+        'func': property_zip.process_zip_neighborhoods,
+        'inputs': [],
+        'outputs': ['property-assessment-fy2025_clean.parquet'],
+        'deps': {'property_df': 'property'},
+    },
+    'crime': {
+        'func': preprocess.process_crime_reports,
+        'inputs': ['crime-incident-reports.csv', NEIGHBORHOODS_GEOJSON],
+        'outputs': ['crime-incident-reports_clean.parquet'],
+        'deps': {},
+    },
+    'open_space': {
+        'func': preprocess.process_open_space,
+        'inputs': ['open-space.geojson'],
+        'outputs': ['open-space_clean.geojson'],
+        'deps': {},
+    },
+    'schools': {
+        'func': preprocess.process_schools,
+        'inputs': ['schools.csv', NEIGHBORHOODS_GEOJSON],
+        'outputs': ['schools_clean.parquet'],
+        'deps': {},
+    },
+    'mbta': {
+        'func': preprocess.process_mbta_gtfs,
+        'inputs': ['mbta-gtfs.zip', NEIGHBORHOODS_GEOJSON],
+        'outputs': ['mbta_stops_clean.parquet'],
+        'deps': {},
+    },
+    'restaurants': {
+        'func': preprocess.process_restaurant_inspections,
+        'inputs': ['restaurant-inspections.csv', NEIGHBORHOODS_GEOJSON],
+        'outputs': ['restaurant-inspections_clean.parquet'],
+        'deps': {},
+    },
+    'neighborhoods': {
+        'func': preprocess.process_boston_neighborhoods,
+        'inputs': [NEIGHBORHOODS_GEOJSON],
+        'outputs': ['boston-neighborhoods_clean.geojson'],
+        'deps': {},
+    },
+    'summary': {
+        'func': preprocess.create_neighborhood_summary,
+        'inputs': [],
+        'outputs': ['neighborhood_summary.parquet'],
+        'deps': {
+            'property_df': 'property_zip',
+            'crime_df': 'crime',
+            'schools_df': 'schools',
+            'mbta_df': 'mbta',
+            'restaurants_df': 'restaurants',
+        },
+    },
+}
+
+def topological_order(stages=STAGES):
+    """Return the stage names with every stage after its dependencies."""
+    order, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline has a dependency cycle through '{name}'")
+        visiting.add(name)
+        for dep in stages[name]['deps'].values():
+            if dep not in stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+def file_digest(path, known):
+    """
+    SHA-256 of a file's content. known maps path -> [size, mtime_ns, digest]
+    from the last run, so unchanged files are not re-read.
+    """
+    stat = os.stat(path)
+    cached = known.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    known[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return known[path][2]
+
+def source_files(path, found=None):
+    """
+    A module's source file followed by the project modules it imports,
+    transitively: every imported module with a file in the scripts directory.
+    """
+    found = found if found is not None else []
+    if path in found:
+        return found
+    found.append(path)
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            candidate = os.path.join(SCRIPTS_DIR, module.split('.')[0] + '.py')
+            if os.path.exists(candidate):
+                source_files(candidate, found)
+    return found
+
+def stage_fingerprint(name, fingerprints, file_hashes, stages=STAGES):
+    """
+    Hash of everything a stage's result depends on: its raw inputs, the code
+    of the module defining it and of the project modules that module imports,
+    the fingerprints of its dependencies and whether CSV exports are written.
+    """
+    stage = stages[name]
+    digest = hashlib.sha256(name.encode('utf-8'))
+    digest.update(f"csv:{export_csv_enabled()}".encode('utf-8'))
+    for path in source_files(os.path.abspath(stage['func'].__code__.co_filename)):
+        digest.update(f"{os.path.basename(path)}:{file_digest(path, file_hashes)}".encode('utf-8'))
+    for filename in stage['inputs']:
+        path = os.path.join(RAW_DIR, filename)
+        content = file_digest(path, file_hashes) if os.path.exists(path) else 'missing'
+        digest.update(f"{filename}:{content}".encode('utf-8'))
+    for arg, dep in sorted(stage['deps'].items()):
+        digest.update(f"{arg}:{fingerprints[dep]}".encode('utf-8'))
+    return digest.hexdigest()
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'stages': {}, 'files': {}}
+
+def _write_atomic(path, data):
+    """Write bytes to path through a temporary file and a rename."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def load_result(name, stages=STAGES):
+    """Reload the result of a skipped stage from its Parquet output."""
+    output = next((output for output in stages[name]['outputs'] if output.endswith('.parquet')), None)
+    if output is None:
+        raise ValueError(f"Stage '{name}' has no Parquet output to reload its result from")
+    return read_processed(os.path.splitext(output)[0])
+
+def is_cached(name, fingerprint, manifest, stages=STAGES):
+    """Whether a stage's outputs were computed from the same inputs and are still on disk."""
+    if manifest['stages'].get(name) != fingerprint:
+        return False
+    return all(os.path.exists(os.path.join(PROCESSED_DIR, output)) for output in stages[name]['outputs'])
+
+def run_stage(name, kwargs):
+    """Run one stage; executed in a worker process."""
+    start = time.perf_counter()
+    result = STAGES[name]['func'](**kwargs)
+    return result, time.perf_counter() - start
+
+def run_pipeline(workers=None, force=False, stages=STAGES):
+    """
+    Run the stages whose inputs changed since the last run, each as soon as
+    its dependencies are done, in a process pool. Dependency results are
+    passed to downstream stages in memory; results of skipped stages are
+    read back from their outputs only when a downstream stage needs them.
+    Returns a dict of stage -> 'cached', 'ran', 'failed' or 'skipped'.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for entry in os.listdir(CACHE_DIR):
+        if entry.endswith('.pkl'):
+            # Pickled results of earlier versions of the pipeline
+            os.remove(os.path.join(CACHE_DIR, entry))
+    manifest = load_manifest()
+    order = topological_order(stages)
+
+    fingerprints = {}
+    for name in order:
+        fingerprints[name] = stage_fingerprint(name, fingerprints, manifest['files'], stages)
+
+    status = {}
+    to_run = []
+    for name in order:
+        if not force and is_cached(name, fingerprints[name], manifest, stages):
+            status[name] = 'cached'
+            logging.info(f"Stage '{name}' is up to date; skipping")
+        else:
+            to_run.append(name)
+
+    results = {}
+
+    def dependency_result(dep):
+        if dep not in results:
+            results[dep] = load_result(dep, stages)
+        return results[dep]
+
+    start = time.perf_counter()
+    pending = set(to_run)
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers or min(len(to_run), os.cpu_count()) or 1) as pool:
+        while pending or running:
+            for name in [n for n in to_run if n in pending]:
+                deps = stages[name]['deps']
+                if any(status.get(dep) in ('failed', 'skipped') for dep in deps.values()):
+                    status[name] = 'skipped'
+                    pending.discard(name)
+                    logging.error(f"Skipping stage '{name}': a dependency failed")
+                elif all(dep in status for dep in deps.values()):
+                    kwargs = {arg: dependency_result(dep) for arg, dep in deps.items()}
+                    running[pool.submit(run_stage, name, kwargs)] = name
+                    pending.discard(name)
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    result, elapsed = None, 0
+                    logging.error(f"Stage '{name}' raised: {e}")
+                if result is None:
+                    # Stages log their own errors and return None on failure
+                    status[name] = 'failed'
+                    manifest['stages'].pop(name, None)
+                    continue
+                results[name] = result
+                status[name] = 'ran'
+                manifest['stages'][name] = fingerprints[name]
+                logging.info(f"Stage '{name}' finished in {elapsed:.2f}s")
+
+    _write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2).encode('utf-8'))
+    logging.info(
+        f"Pipeline finished in {time.perf_counter() - start:.2f}s: "
+        + ", ".join(f"{name} {status[name]}" for name in order)
+    )
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the preprocessing stages whose inputs changed.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="Re-run every stage, ignoring the stage cache")
+    parser.add_argument('--csv', action='store_true', help="Also export the processed datasets as CSV")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        # Read by the stages in the worker processes
+        os.environ['PREPROCESS_EXPORT_CSV'] = '1'
+
+    status = run_pipeline(workers=args.workers, force=args.force)
+    if any(result in ('failed', 'skipped') for result in status.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import functools
 import pandas as pd
 import geopandas as gpd
 import zipfile
@@ -6,7 +7,8 @@ import logging
 import fiona
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
-from shapely.geometry import Point
+import shapely
+from processed import RAW_DIR, PROCESSED_DIR, write_processed, read_processed
 
 if not hasattr(fiona, 'path'):
     fiona.path = lambda x: x
@@ -15,11 +17,67 @@ fiona.drvsupport.supported_drivers['GeoJSON'] = 'rw'
 # Configure logging to include timestamps and log levels.
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Define directories based on the project structure.
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-RAW_DIR = os.path.join(BASE_DIR, '../data/raw')
-PROCESSED_DIR = os.path.join(BASE_DIR, '../data/processed')
-os.makedirs(PROCESSED_DIR, exist_ok=True)
+NEIGHBORHOODS_PATH = os.path.join(RAW_DIR, 'boston-neighborhoods.geojson')
+
+# Candidate names of the neighborhood name property in the GeoJSON
+NEIGHBORHOOD_NAME_COLUMNS = ['Name', 'neighborhood', 'NEIGHBORHO']
+
+# Number of points mapped to neighborhoods per spatial index query
+MAPPING_CHUNK_SIZE = 200000
+
+class NeighborhoodIndex:
+    """
+    Neighborhood polygons in an STRtree, with the geometries prepared so
+    point-in-polygon tests against them are fast.
+    """
+
+    def __init__(self, path=NEIGHBORHOODS_PATH):
+        neighborhoods = gpd.read_file(path)
+        logging.info(f"Neighborhoods GeoJSON columns: {neighborhoods.columns.tolist()}")
+
+        name_col = next((col for col in NEIGHBORHOOD_NAME_COLUMNS if col in neighborhoods.columns), None)
+        if name_col is None:
+            raise ValueError("Could not find neighborhood name column in GeoJSON file")
+
+        self.names = neighborhoods[name_col].to_numpy(dtype=object)
+        self.polygons = np.asarray(neighborhoods.geometry.values)
+        self.bounds = shapely.bounds(self.polygons)
+        shapely.prepare(self.polygons)
+        self.tree = shapely.STRtree(self.polygons)
+
+    def lookup(self, lon, lat, chunk_size=MAPPING_CHUNK_SIZE):
+        """
+        Return the neighborhood name containing each point, or None for
+        points outside every neighborhood or with missing coordinates.
+        Points are tested as coordinate arrays, chunk by chunk, against the
+        polygons the tree finds for the chunk. Boundaries count as inside, so
+        points on a border shared by two neighborhoods get the first one in
+        the file.
+        """
+        lon = pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype=float)
+        lat = pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=float)
+        names = np.full(len(lon), None, dtype=object)
+
+        valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        for start in range(0, len(valid), chunk_size):
+            rows = valid[start:start + chunk_size]
+            x, y = lon[rows], lat[rows]
+            unmatched = np.ones(len(rows), dtype=bool)
+            extent = shapely.box(x.min(), y.min(), x.max(), y.max())
+            for i in np.sort(self.tree.query(extent)):
+                min_x, min_y, max_x, max_y = self.bounds[i]
+                candidates = np.flatnonzero(
+                    unmatched & (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+                )
+                inside = candidates[shapely.intersects_xy(self.polygons[i], x[candidates], y[candidates])]
+                names[rows[inside]] = self.names[i]
+                unmatched[inside] = False
+        return names
+
+@functools.lru_cache(maxsize=None)
+def load_neighborhood_index(path=NEIGHBORHOODS_PATH):
+    """The neighborhood index, read and built once per process."""
+    return NeighborhoodIndex(path)
 
 def map_to_neighborhoods(df, lat_col, lon_col):
     """
@@ -27,32 +85,11 @@ def map_to_neighborhoods(df, lat_col, lon_col):
     Returns the DataFrame with an added 'neighborhood' column.
     """
     try:
-        # Load Boston neighborhoods GeoJSON
-        neighborhoods_path = os.path.join(RAW_DIR, 'boston-neighborhoods.geojson')
-        neighborhoods = gpd.read_file(neighborhoods_path)
-        
-        # Print column names for debugging
-        logging.info(f"Neighborhoods GeoJSON columns: {neighborhoods.columns.tolist()}")
-        
-        # Create Point geometries from coordinates
-        geometry = [Point(xy) for xy in zip(df[lon_col], df[lat_col])]
-        points = gpd.GeoDataFrame(df, geometry=geometry, crs=neighborhoods.crs)
-        
-        # Perform spatial join
-        joined = gpd.sjoin(points, neighborhoods, how='left', predicate='within')
-        
-        # Get the neighborhood name column (try different possible names)
-        neighborhood_col = None
-        for col in ['Name', 'neighborhood', 'NEIGHBORHO']:
-            if col in joined.columns:
-                neighborhood_col = col
-                break
-        
-        if neighborhood_col is None:
-            raise ValueError("Could not find neighborhood name column in GeoJSON file")
-        
-        # Add neighborhood column to original DataFrame
-        df['neighborhood'] = joined[neighborhood_col]
+        index = load_neighborhood_index()
+        df['neighborhood'] = index.lookup(df[lon_col].to_numpy(), df[lat_col].to_numpy())
+        logging.info(
+            f"Mapped {df['neighborhood'].notna().sum()} of {len(df)} rows to neighborhoods"
+        )
         return df
     except Exception as e:
         logging.error(f"Error mapping coordinates to neighborhoods: {e}")
@@ -90,7 +127,8 @@ def calculate_affordability_metrics(property_df, demographics_df):
 def process_property_assessment():
     """
     Load the property assessment data, remove duplicates, handle missing values,
-    and save the cleaned data.
+    and save the result for the property_zip stage, which fills in missing
+    neighborhoods by ZIP code and writes the cleaned dataset.
     """
     file_path = os.path.join(RAW_DIR, 'property-assessment-fy2025.csv')
     try:
@@ -114,9 +152,7 @@ def process_property_assessment():
         if 'neighborhood' not in df.columns and 'Lat' in df.columns and 'Long' in df.columns:
             df = map_to_neighborhoods(df, 'Lat', 'Long')
         
-        cleaned_path = os.path.join(PROCESSED_DIR, 'property-assessment-fy2025_clean.csv')
-        df.to_csv(cleaned_path, index=False)
-        logging.info(f"Cleaned property assessment data saved to {cleaned_path}")
+        write_processed(df, 'property-assessment-fy2025_located')
         return df
     except Exception as e:
         logging.error(f"Error processing property assessment data: {e}")
@@ -147,9 +183,7 @@ def process_crime_reports():
         # Add crime rate to DataFrame
         df['crime_rate'] = df['neighborhood'].map(crime_rate)
         
-        cleaned_path = os.path.join(PROCESSED_DIR, 'crime-incident-reports_clean.csv')
-        df.to_csv(cleaned_path, index=False)
-        logging.info(f"Cleaned crime incident reports saved to {cleaned_path}")
+        write_processed(df, 'crime-incident-reports_clean')
         return df
     except Exception as e:
         logging.error(f"Error processing crime incident reports: {e}")
@@ -227,9 +261,7 @@ def process_schools():
             logging.info("Neighborhood distribution in schools data:")
             logging.info(df['neighborhood'].value_counts())
         
-        cleaned_path = os.path.join(PROCESSED_DIR, 'schools_clean.csv')
-        df.to_csv(cleaned_path, index=False)
-        logging.info(f"Cleaned schools data saved to {cleaned_path}")
+        write_processed(df, 'schools_clean')
         return df
     except Exception as e:
         logging.error(f"Error processing schools data: {e}")
@@ -257,9 +289,7 @@ def process_mbta_gtfs():
             if 'stop_lat' in df.columns and 'stop_lon' in df.columns:
                 df = map_to_neighborhoods(df, 'stop_lat', 'stop_lon')
             
-            cleaned_path = os.path.join(PROCESSED_DIR, 'mbta_stops_clean.csv')
-            df.to_csv(cleaned_path, index=False)
-            logging.info(f"Cleaned MBTA stops data saved to {cleaned_path}")
+            write_processed(df, 'mbta_stops_clean')
             return df
         else:
             logging.warning("stops.txt not found in MBTA GTFS data.")
@@ -284,25 +314,29 @@ def process_restaurant_inspections():
         if 'Lat' in df.columns and 'Long' in df.columns:
             df = map_to_neighborhoods(df, 'Lat', 'Long')
         
-        cleaned_path = os.path.join(PROCESSED_DIR, 'restaurant-inspections_clean.csv')
-        df.to_csv(cleaned_path, index=False)
-        logging.info(f"Cleaned restaurant inspections data saved to {cleaned_path}")
+        write_processed(df, 'restaurant-inspections_clean')
         return df
     except Exception as e:
         logging.error(f"Error processing restaurant inspections data: {e}")
         return None
 
-def create_neighborhood_summary():
+def _processed_frame(df, name):
+    """Return df, or read it back from data/processed when it was not passed in."""
+    if df is not None:
+        return df
+    return read_processed(name)
+
+def create_neighborhood_summary(property_df=None, crime_df=None, schools_df=None, mbta_df=None, restaurants_df=None):
     """
-    Create a comprehensive summary of all neighborhood metrics.
+    Create a comprehensive summary of all neighborhood metrics. Uses the
+    cleaned DataFrames passed in and reads any missing one from its CSV.
     """
     try:
-        # Load all processed data
-        property_df = pd.read_csv(os.path.join(PROCESSED_DIR, 'property-assessment-fy2025_clean.csv'), low_memory=False)
-        crime_df = pd.read_csv(os.path.join(PROCESSED_DIR, 'crime-incident-reports_clean.csv'), low_memory=False)
-        schools_df = pd.read_csv(os.path.join(PROCESSED_DIR, 'schools_clean.csv'), low_memory=False)
-        mbta_df = pd.read_csv(os.path.join(PROCESSED_DIR, 'mbta_stops_clean.csv'), low_memory=False)
-        restaurants_df = pd.read_csv(os.path.join(PROCESSED_DIR, 'restaurant-inspections_clean.csv'), low_memory=False)
+        property_df = _processed_frame(property_df, 'property-assessment-fy2025_clean')
+        crime_df = _processed_frame(crime_df, 'crime-incident-reports_clean')
+        schools_df = _processed_frame(schools_df, 'schools_clean')
+        mbta_df = _processed_frame(mbta_df, 'mbta_stops_clean')
+        restaurants_df = _processed_frame(restaurants_df, 'restaurant-inspections_clean')
         
         # Create neighborhood summary DataFrame
         summary_df = pd.DataFrame()
@@ -330,28 +364,24 @@ def create_neighborhood_summary():
                 summary_df[f'{col}_score'] = scaler.fit_transform(summary_df[[col]])
         
         # Save summary
-        summary_path = os.path.join(PROCESSED_DIR, 'neighborhood_summary.csv')
-        summary_df.to_csv(summary_path)
-        logging.info(f"Neighborhood summary saved to {summary_path}")
+        write_processed(summary_df.rename_axis('neighborhood').reset_index(), 'neighborhood_summary')
         return summary_df
     except Exception as e:
         logging.error(f"Error creating neighborhood summary: {e}")
         return None
 
 def main():
-    # Process all datasets
-    property_df = process_property_assessment()
-    crime_df = process_crime_reports()
-    open_space_gdf = process_open_space()
-    schools_df = process_schools()
-    mbta_df = process_mbta_gtfs()
-    restaurants_df = process_restaurant_inspections()
-    neighborhoods_gdf = process_boston_neighborhoods()
-    
-    # Create neighborhood summary
-    summary_df = create_neighborhood_summary()
-    
-    logging.info("All data processing completed successfully")
+    # Process all datasets through the pipeline's stage graph, so this produces
+    # the same outputs as pipeline.py (including the ZIP code neighborhoods).
+    # Imported here: pipeline imports this module for its stages.
+    from pipeline import run_pipeline
+    status = run_pipeline(force=True)
+    failed = [name for name, result in status.items() if result in ('failed', 'skipped')]
+    if failed:
+        # Like the stages themselves, log failures and carry on
+        logging.error(f"Data processing finished with failed stages: {failed}")
+    else:
+        logging.info("All data processing completed successfully")
 
 if __name__ == "__main__":
     main()
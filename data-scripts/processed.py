@@ -0,0 +1,80 @@
+import os
+import logging
+import tempfile
+import pandas as pd
+
+# Define directories based on the project structure.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_DIR = os.path.join(BASE_DIR, '../data/raw')
+PROCESSED_DIR = os.path.join(BASE_DIR, '../data/processed')
+os.makedirs(PROCESSED_DIR, exist_ok=True)
+
+# Columns formatted as "$1,234" or "1,234" in the raw data, stored as numbers
+NUMERIC_TEXT_COLUMNS = ['land_sf', 'gross_area', 'living_area', 'land_value', 'bldg_value', 'total_value', 'gross_tax']
+ZIP_COLUMNS = ['zip_code']
+DATE_COLUMNS = ['date', 'occurred_on_date']
+
+def export_csv_enabled():
+    """Whether processed datasets are also written as CSV (PREPROCESS_EXPORT_CSV=1)."""
+    return os.getenv('PREPROCESS_EXPORT_CSV', '0').lower() in ('1', 'true', 'yes')
+
+def normalize_zip(series):
+    """
+    Vectorized ZIP code normalization to 5-digit strings: handles values read
+    as floats (2134.0) and strips ZIP+4 suffixes. Anything else becomes NA.
+    """
+    # A dataset has few distinct ZIP codes: normalize those and take them back
+    # by code; code -1 (missing) picks the trailing NA
+    codes, uniques = pd.factorize(series)
+    zips = pd.Series(uniques, dtype=object).astype('string').str.strip().str.replace(r'\.0+$', '', regex=True)
+    zips = zips.str.split('-', n=1).str[0].astype('string').str.zfill(5)
+    zips = pd.concat([zips.where(zips.str.fullmatch(r'\d{5}')), pd.Series([pd.NA], dtype='string')], ignore_index=True)
+    return pd.Series(zips.take(codes).array, index=series.index, name=series.name)
+
+def apply_processed_dtypes(df):
+    """
+    Give a processed dataset proper column types: numbers for currency and
+    area columns, 5-digit strings for ZIP codes, timestamps for dates and a
+    string type for every other text column. Column names are matched
+    case-insensitively since the raw datasets use upper-case headers.
+    """
+    for col in df.columns:
+        key = str(col).lower()
+        if key in NUMERIC_TEXT_COLUMNS and df[col].dtype == object:
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[\$,\s]', '', regex=True), errors='coerce')
+        elif key in ZIP_COLUMNS:
+            df[col] = normalize_zip(df[col])
+        elif key in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif df[col].dtype == object:
+            df[col] = df[col].astype('string')
+    return df
+
+def write_processed(df, name):
+    """
+    Write a processed dataset to data/processed as typed Parquet, plus a CSV
+    export when enabled. Files are replaced atomically. Returns the Parquet path.
+    """
+    df = apply_processed_dtypes(df)
+    path = os.path.join(PROCESSED_DIR, f'{name}.parquet')
+    fd, tmp_path = tempfile.mkstemp(dir=PROCESSED_DIR, suffix='.tmp')
+    os.close(fd)
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    logging.info(f"Saved {len(df)} rows to {path}")
+
+    if export_csv_enabled():
+        csv_path = os.path.join(PROCESSED_DIR, f'{name}.csv')
+        fd, tmp_path = tempfile.mkstemp(dir=PROCESSED_DIR, suffix='.tmp')
+        os.close(fd)
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, csv_path)
+        logging.info(f"Exported CSV to {csv_path}")
+    return path
+
+def read_processed(name):
+    """Read a processed dataset, preferring Parquet over a CSV export."""
+    path = os.path.join(PROCESSED_DIR, f'{name}.parquet')
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    return pd.read_csv(os.path.join(PROCESSED_DIR, f'{name}.csv'), low_memory=False)
@@ -1,4 +1,20 @@
+import os
+import argparse
+import csv
+import logging
+import tempfile
+import numpy as np
 import pandas as pd
+from processed import PROCESSED_DIR, normalize_zip, write_processed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Configure logging to include timestamps and log levels.
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Define a dictionary to map Boston ZIP codes to neighborhoods.
 # Update or expand the dictionary as needed based on your local knowledge.
@@ -42,47 +58,161 @@ zip_to_neighborhood = {
     "02132": "West Roxbury"
 }
 
-# Load your dataset from a CSV file.
-# First, let's read the first line to check the actual format
-with open("property-assessment-fy2025_clean.csv", 'r') as f:
-    first_line = f.readline()
-    print("First line of file:", first_line)
+PROPERTY_DATASET = 'property-assessment-fy2025_clean'
+ZIP_COLUMN = 'zip_code'
+NEIGHBORHOOD_COLUMN = 'neighborhood'
+CHUNK_SIZE = 100000
+CSV_DELIMITERS = ',\t;|'
 
-# Try reading with different delimiters
-try:
-    df = pd.read_csv("property-assessment-fy2025_clean.csv", delimiter=",")
-except:
+# Categorical lookup: a ZIP's category code indexes the code of its
+# neighborhood. The trailing -1 maps unknown ZIPs (code -1) to a missing value.
+ZIP_DTYPE = pd.CategoricalDtype(list(zip_to_neighborhood))
+NEIGHBORHOOD_DTYPE = pd.CategoricalDtype(sorted(set(zip_to_neighborhood.values())))
+ZIP_NEIGHBORHOOD_CODES = np.append(
+    NEIGHBORHOOD_DTYPE.categories.get_indexer(list(zip_to_neighborhood.values())), -1
+)
+
+def find_column(df, name):
+    """The column matching name case-insensitively (raw exports use ZIP_CODE), or None."""
+    return next((col for col in df.columns if str(col).lower() == name.lower()), None)
+
+def map_zip_neighborhoods(df, zip_column=ZIP_COLUMN):
+    """
+    Normalize the ZIP codes of a chunk and fill in the neighborhood of rows
+    that have none from them. Neighborhoods already mapped from coordinates
+    are kept: several names in zip_to_neighborhood are not neighborhoods of
+    the boundaries or demographics datasets.
+    """
+    df.columns = df.columns.str.strip()
+    zip_column = find_column(df, zip_column) or zip_column
+    zips = normalize_zip(df[zip_column])
+    codes = ZIP_NEIGHBORHOOD_CODES[pd.Categorical(zips, dtype=ZIP_DTYPE).codes]
+    neighborhoods = pd.Series(
+        pd.Categorical.from_codes(codes, dtype=NEIGHBORHOOD_DTYPE), index=df.index
+    ).astype('string')
+    df[zip_column] = zips
+    if NEIGHBORHOOD_COLUMN in df.columns:
+        neighborhoods = df[NEIGHBORHOOD_COLUMN].astype('string').fillna(neighborhoods)
+    df[NEIGHBORHOOD_COLUMN] = neighborhoods
+    return df
+
+def process_zip_neighborhoods(property_df):
+    """
+    Pipeline stage: fill in the neighborhoods of the property stage's
+    assessments without one by ZIP code and save them as the cleaned dataset.
+    """
     try:
-        df = pd.read_csv("property-assessment-fy2025_clean.csv", delimiter="\t")
-    except:
-        df = pd.read_csv("property-assessment-fy2025_clean.csv")
-
-# Clean column headers by stripping extra whitespace.
-df.columns = df.columns.str.strip()
-
-# Print the actual column names for debugging
-print("Actual column names:", df.columns.tolist())
-
-# Function to safely convert a ZIP code to a zero-padded 5-digit string.
-def format_zip(val):
-    if pd.notna(val):
-        try:
-            # Some ZIP codes may be read as floats; first convert to float then int.
-            return str(int(float(val))).zfill(5)
-        except Exception as e:
-            print(f"Could not convert value '{val}' to a 5-digit string: {e}")
-            return None
-    else:
+        if find_column(property_df, ZIP_COLUMN) is None:
+            logging.warning("Property assessments have no ZIP code column; keeping their neighborhoods")
+            df = property_df
+        else:
+            df = map_zip_neighborhoods(property_df)
+        write_processed(df, PROPERTY_DATASET)
+        logging.info(f"{df[NEIGHBORHOOD_COLUMN].notna().sum()} of {len(df)} properties have a neighborhood after the ZIP code lookup")
+        return df
+    except Exception as e:
+        logging.error(f"Error mapping ZIP codes to neighborhoods: {e}")
         return None
 
-# Apply the conversion function to the 'zip_code' column.
-df['zip_code'] = df['zip_code'].apply(format_zip)
+def sniff_delimiter(path, sample_size=64 * 1024):
+    """Detect a CSV file's delimiter from its first lines, defaulting to a comma."""
+    with open(path, 'r', newline='') as f:
+        sample = f.read(sample_size)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+def read_chunks(path, chunk_size=CHUNK_SIZE, zip_column=ZIP_COLUMN):
+    """Yield a Parquet or CSV file as DataFrame chunks; CSV ZIP codes are read as text."""
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    delimiter = sniff_delimiter(path)
+    with open(path, 'r', newline='') as f:
+        columns = [name.strip() for name in next(csv.reader(f, delimiter=delimiter))]
+    logging.info(f"Reading {path} with delimiter {delimiter!r}")
+    yield from pd.read_csv(
+        path, sep=delimiter, names=columns, header=0, chunksize=chunk_size,
+        dtype={zip_column: str}, low_memory=False,
+    )
+
+def output_schema(input_path, zip_column=ZIP_COLUMN):
+    """
+    Arrow schema of a processed Parquet file: the input file's schema with
+    ZIP codes and neighborhoods as strings. Taken from the file rather than
+    the first chunk, in which an all-null column would be typed null.
+    """
+    fields = []
+    for field in pq.ParquetFile(input_path).schema_arrow:
+        name = field.name.strip()
+        if name.startswith('__index_level_'):
+            continue
+        if name.lower() == zip_column.lower() or name == NEIGHBORHOOD_COLUMN:
+            field = pa.field(name, pa.string())
+        fields.append(field.with_name(name))
+    if NEIGHBORHOOD_COLUMN not in [field.name for field in fields]:
+        fields.append(pa.field(NEIGHBORHOOD_COLUMN, pa.string()))
+    return pa.schema(fields)
+
+def process_file(input_path, output_path=None, chunk_size=CHUNK_SIZE, zip_column=ZIP_COLUMN):
+    """
+    Stream a property file through map_zip_neighborhoods one chunk at a time.
+    The result is written to a temporary file in the output's directory and
+    renamed over output_path (the input by default) once complete. Parquet
+    input is written as Parquet, CSV input as comma-separated CSV.
+    """
+    output_path = output_path or input_path
+    is_parquet = input_path.endswith('.parquet')
+    if is_parquet and pq is None:
+        raise RuntimeError("pyarrow is required to process Parquet files")
+
+    schema = output_schema(input_path, zip_column) if is_parquet else None
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.tmp')
+    os.close(fd)
+    rows = mapped = 0
+    writer = None
+    try:
+        for chunk in read_chunks(input_path, chunk_size, zip_column):
+            chunk = map_zip_neighborhoods(chunk, zip_column)
+            if is_parquet:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_path, mode='a' if rows else 'w', header=not rows, index=False)
+            rows += len(chunk)
+            mapped += int(chunk[NEIGHBORHOOD_COLUMN].notna().sum())
+        if writer is not None:
+            writer.close()
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        os.unlink(tmp_path)
+        raise
+
+    logging.info(f"{mapped} of {rows} properties have a neighborhood after the ZIP code lookup; saved to {output_path}")
+    return rows, mapped
+
+def default_input():
+    """The processed property dataset, preferring Parquet over a CSV export."""
+    path = os.path.join(PROCESSED_DIR, f'{PROPERTY_DATASET}.parquet')
+    if os.path.exists(path):
+        return path
+    return os.path.join(PROCESSED_DIR, f'{PROPERTY_DATASET}.csv')
 
-# Map the ZIP codes to neighborhoods using the dictionary.
-df['neighborhood'] = df['zip_code'].map(zip_to_neighborhood)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Map property assessments to neighborhoods by ZIP code.")
+    parser.add_argument('--input', default=None, help="Parquet or CSV file (default: the processed property dataset)")
+    parser.add_argument('--output', default=None, help="Where to write the result (default: replace the input)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f"Rows per chunk (default: {CHUNK_SIZE})")
+    parser.add_argument('--zip-column', default=ZIP_COLUMN, help=f"ZIP code column (default: {ZIP_COLUMN})")
+    args = parser.parse_args(argv)
 
-# Write the modified DataFrame to a new CSV file.
-output_csv = "property-assessment-fy2025_clean.csv"
-df.to_csv(output_csv, index=False)
+    process_file(args.input or default_input(), args.output, args.chunk_size, args.zip_column)
 
-print(f"CSV file saved as {output_csv}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+import logging
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from quantiles import exact_quantiles, grouped_quantiles, median, TDigest
+from models import PropertyAssessment, CrimeIncident, School, MBTAStop, RestaurantInspection
+
+logger = logging.getLogger(__name__)
+
+# Index label of the city-wide row in the frames returned below
+CITYWIDE = None
+
+# Quantiles computed for each property column, as (column prefix, quantile)
+PROPERTY_QUANTILES = {
+    'total_value': ('property_value', [('median', 0.5), ('p10', 0.1), ('p25', 0.25), ('p75', 0.75), ('p90', 0.9)]),
+    'living_area': ('living_area', [('median', 0.5), ('p25', 0.25), ('p75', 0.75)]),
+    'yr_built': ('year_built', [('median', 0.5), ('p25', 0.25), ('p75', 0.75)]),
+}
+
+AMENITY_MODELS = [
+    ('school_count', School),
+    ('mbta_stops_count', MBTAStop),
+    ('restaurant_count', RestaurantInspection),
+]
+
+def read_frame(db: Session, statement, columns):
+    """Run a Core select and return its rows as a DataFrame."""
+    return pd.DataFrame.from_records(db.execute(statement).all(), columns=columns)
+
+def _with_citywide(grouped, citywide):
+    """Append the city-wide row (a Series or dict) to a frame indexed by neighborhood."""
+    citywide_row = pd.DataFrame([citywide], index=pd.Index([CITYWIDE], dtype=object))
+    grouped.index = grouped.index.astype(object)
+    return pd.concat([grouped, citywide_row])
+
+def _quantile_row(values_by_column):
+    """Name the quantiles computed for each property column as stats columns."""
+    row = {}
+    for column, (prefix, names) in PROPERTY_QUANTILES.items():
+        for (suffix, _), value in zip(names, values_by_column[column]):
+            row[f'{suffix}_{prefix}'] = value
+    return row
+
+def property_metrics(db: Session):
+    """
+    Property count and value, living area and year built quantiles per
+    neighborhood (properties with a positive total_value), plus the mean value
+    over all assessed properties and a serialized t-digest of the values.
+    Two queries and one grouped selection pass per column.
+    """
+    frame = read_frame(
+        db,
+        select(PropertyAssessment.neighborhood, PropertyAssessment.total_value,
+               PropertyAssessment.living_area, PropertyAssessment.yr_built)
+        .where(PropertyAssessment.total_value.isnot(None), PropertyAssessment.total_value > 0),
+        ['neighborhood', 'total_value', 'living_area', 'yr_built']
+    )
+    neighborhoods = frame['neighborhood'].to_numpy(dtype=object)
+
+    per_column = {}
+    citywide_values = {}
+    for column, (_, names) in PROPERTY_QUANTILES.items():
+        qs = [q for _, q in names]
+        values = frame[column].to_numpy(dtype=float, na_value=np.nan)
+        per_column[column] = grouped_quantiles(neighborhoods, values, qs)
+        citywide_values[column] = exact_quantiles(values, qs)
+
+    rows = {}
+    for neighborhood in per_column['total_value']:
+        rows[neighborhood] = _quantile_row({
+            column: per_column[column].get(neighborhood, [None] * len(PROPERTY_QUANTILES[column][1]))
+            for column in PROPERTY_QUANTILES
+        })
+    grouped = pd.DataFrame.from_dict(rows, orient='index')
+    grouped['property_count'] = frame.groupby('neighborhood').size()
+    grouped['property_value_digest'] = pd.Series({
+        neighborhood: json.dumps(TDigest.from_values(group.to_numpy(dtype=float)).to_dict())
+        for neighborhood, group in frame.groupby('neighborhood')['total_value']
+    }, dtype=object)
+
+    citywide = _quantile_row(citywide_values)
+    citywide['property_count'] = len(frame)
+    citywide['property_value_digest'] = json.dumps(
+        TDigest.from_values(frame['total_value'].to_numpy(dtype=float)).to_dict()
+    )
+    metrics = _with_citywide(grouped, citywide)
+
+    means = dict(db.execute(
+        select(PropertyAssessment.neighborhood, func.avg(PropertyAssessment.total_value))
+        .group_by(PropertyAssessment.neighborhood)
+    ).all())
+    means.pop(None, None)
+    means[CITYWIDE] = db.execute(select(func.avg(PropertyAssessment.total_value))).scalar()
+    metrics['avg_property_value'] = pd.Series(means, dtype=float)
+    return metrics
+
+def crime_metrics(db: Session):
+    """
+    Crime count, mean and median crime rate per neighborhood. Counts and means
+    come from one grouped query; medians from one grouped selection pass.
+    """
+    counts = read_frame(
+        db,
+        select(CrimeIncident.neighborhood, func.count(CrimeIncident.id), func.avg(CrimeIncident.crime_rate))
+        .group_by(CrimeIncident.neighborhood),
+        ['neighborhood', 'crime_count', 'avg_crime_rate']
+    ).dropna(subset=['neighborhood']).set_index('neighborhood')
+
+    rates = read_frame(
+        db,
+        select(CrimeIncident.neighborhood, CrimeIncident.crime_rate).where(CrimeIncident.crime_rate.isnot(None)),
+        ['neighborhood', 'crime_rate']
+    )
+    rate_values = rates['crime_rate'].to_numpy(dtype=float)
+    medians = grouped_quantiles(rates['neighborhood'].to_numpy(dtype=object), rate_values, [0.5])
+    counts['median_crime_rate'] = pd.Series({n: values[0] for n, values in medians.items()}, dtype=float)
+
+    total_count, total_avg = db.execute(
+        select(func.count(CrimeIncident.id), func.avg(CrimeIncident.crime_rate))
+    ).one()
+    citywide = {
+        'crime_count': total_count,
+        'avg_crime_rate': total_avg,
+        'median_crime_rate': median(rate_values),
+    }
+    return _with_citywide(counts, citywide)
+
+def amenity_metrics(db: Session):
+    """School, MBTA stop and restaurant counts per neighborhood, one grouped query per table."""
+    counts = {}
+    for column, model in AMENITY_MODELS:
+        rows = db.execute(
+            select(model.neighborhood, func.count(model.id)).group_by(model.neighborhood)
+        ).all()
+        column_counts = {neighborhood: count for neighborhood, count in rows if neighborhood is not None}
+        column_counts[CITYWIDE] = sum(count for _, count in rows)
+        counts[column] = column_counts
+
+    metrics = pd.DataFrame(counts)
+    metrics.index = metrics.index.astype(object)
+    return metrics
+
+def neighborhood_metrics(db: Session):
+    """
+    Compute every per-neighborhood metric in a constant number of grouped
+    queries. Returns a DataFrame indexed by neighborhood with the city-wide
+    figures under CITYWIDE; counts missing for a neighborhood are zero.
+    """
+    metrics = pd.concat([property_metrics(db), crime_metrics(db), amenity_metrics(db)], axis=1)
+    count_columns = ['property_count', 'crime_count'] + [column for column, _ in AMENITY_MODELS]
+    # Cast before filling: on an empty database the columns are all-None objects
+    metrics[count_columns] = metrics[count_columns].astype(float).fillna(0).astype(int)
+    numeric_columns = metrics.columns.drop(['property_value_digest', *count_columns])
+    metrics[numeric_columns] = metrics[numeric_columns].astype(float).fillna(0.0)
+    return metrics
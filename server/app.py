@@ -1,9 +1,23 @@
 # backend/app.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from dbConnection import SessionLocal, init_db, get_db
+from dbConnection import ReadSessionLocal, init_db
 from models import NeighborhoodDemographics, PropertyAssessment, CrimeIncident, School, MBTAStop, RestaurantInspection
 from sqlalchemy import func, case
+from neighborhood_stats import get_neighborhood_stats
+from db_backend import month_bucket
+from quantiles import exact_quantiles, median, TDigest
+from property_store import property_store
+import nearby
+import crime_feed
+import crime_density
+from tiles import tile_service, valid_tile
+from spatial_index import POINT_LAYERS
+from response_layer import init_response_layer
+from cache_backend import cacheable_response, versioned_cache_key
+from data_version import data_versions
+from cache_warmer import start_background_warmer
+from boundaries import DEFAULT_DETAIL, DETAIL_LEVELS, boundaries_artifact, build_boundaries
 import logging
 import sys
 import traceback
@@ -11,14 +25,22 @@ from flask_caching import Cache
 import os
 import json
 
-# Configure logging to output to both file and console
+# Debug mode and logging are configured from the environment so the same
+# module serves both the dev server and gunicorn workers
+DEBUG = os.getenv('FLASK_DEBUG', '0').lower() in ('1', 'true', 'yes')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'server.log' if DEBUG else '')
+
+# Configure logging to the console, and to LOG_FILE when set
+log_handlers = [logging.StreamHandler(sys.stdout)]
+if LOG_FILE:
+    log_handlers.append(logging.FileHandler(LOG_FILE))
 logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('server.log')
-    ]
+    level=LOG_LEVEL,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s',
+    handlers=log_handlers,
+    # Replace the handlers installed by modules imported above
+    force=True
 )
 logger = logging.getLogger(__name__)
 
@@ -36,16 +58,49 @@ CORS(app, resources={
     }
 })
 
-# Initialize database
-logger.info("Initializing database...")
-init_db()
-logger.info("Database initialized successfully")
-
-# Initialize cache
+# Compression, ETags and conditional GET for the API and tile responses
+init_response_layer(app)
+
+# Initialize database. Under gunicorn the master runs the DDL once before
+# forking and sets INIT_DB=0 so workers skip it.
+if os.getenv('INIT_DB', '1') != '0':
+    logger.info("Initializing database...")
+    init_db()
+    logger.info("Database initialized successfully")
+
+# Build the in-memory property store (/api/search) and nearby index (/api/nearby)
+db = ReadSessionLocal()
+try:
+    property_store.load(db)
+    nearby.nearby_index.load(db)
+    # Drop tiles cached on disk for any other data version
+    tile_service.sync_version(db)
+finally:
+    db.close()
+
+def request_db():
+    """
+    Read-only session for the current request, opened on first use and
+    closed by close_request_db when the request ends, even on errors.
+    """
+    if 'db' not in g:
+        g.db = ReadSessionLocal()
+    return g.db
+
+@app.teardown_appcontext
+def close_request_db(exception=None):
+    """Return the request's connection to the read pool."""
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
+
+# Initialize cache: an in-process LRU in front of a store shared by all workers.
+# Keys include the data version, so entries only go stale when the loaders run.
 cache = Cache(app, config={
-    'CACHE_TYPE': 'simple',
-    'CACHE_DEFAULT_TIMEOUT': 300  # 5 minutes
+    'CACHE_TYPE': 'cache_backend.TieredCache',
+    'CACHE_DEFAULT_TIMEOUT': 86400  # 1 day
 })
+cached_endpoint = cache.cached(make_cache_key=versioned_cache_key, response_filter=cacheable_response)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -54,12 +109,13 @@ def health_check():
     return jsonify({"status": "ok"})
 
 @app.route('/api/neighborhoods', methods=['GET'])
+@cached_endpoint
 def get_neighborhoods():
     """
     API endpoint to retrieve all neighborhood demographics.
     Queries the 'neighborhood_demographics' table and returns JSON.
     """
-    db = next(get_db())
+    db = request_db()
     try:
         logger.info("Fetching neighborhoods...")
         neighborhoods = db.query(NeighborhoodDemographics.neighborhood).distinct().all()
@@ -70,101 +126,48 @@ def get_neighborhoods():
         return jsonify({"error": "Failed to fetch neighborhoods"}), 500
 
 @app.route('/api/neighborhood-boundaries', methods=['GET'])
-@cache.cached(timeout=300)  # Cache for 5 minutes
 def get_neighborhood_boundaries():
-    """API endpoint to retrieve neighborhood boundaries in GeoJSON format."""
-    db = next(get_db())
+    """
+    API endpoint to retrieve neighborhood boundaries in GeoJSON format.
+    Serves the prebuilt artifact written by load_data.py; `detail` picks the
+    simplification level (full, high, medium or low).
+    """
+    detail = request.args.get('detail', DEFAULT_DETAIL)
+    if detail not in DETAIL_LEVELS:
+        return jsonify({"error": f"detail must be one of {', '.join(DETAIL_LEVELS)}"}), 400
+
     try:
-        logger.info("Fetching neighborhood boundaries...")
-        
-        # First check if we have any neighborhoods
-        neighborhood_count = db.query(func.count(NeighborhoodDemographics.id)).scalar()
-        logger.info(f"Total neighborhoods in database: {neighborhood_count}")
-        
-        if neighborhood_count == 0:
-            logger.error("No neighborhoods found in database")
-            return jsonify({"error": "No neighborhood data available"}), 500
-        
-        # Get neighborhood data with aggregated statistics using subqueries for better performance
-        neighborhoods = db.query(
-            NeighborhoodDemographics.neighborhood,
-            func.coalesce(
-                db.query(func.count(School.id))
-                .filter(School.neighborhood == NeighborhoodDemographics.neighborhood)
-                .scalar_subquery(),
-                0
-            ).label('school_count'),
-            func.coalesce(
-                db.query(func.count(MBTAStop.id))
-                .filter(MBTAStop.neighborhood == NeighborhoodDemographics.neighborhood)
-                .scalar_subquery(),
-                0
-            ).label('transit_stops'),
-            func.coalesce(
-                db.query(func.avg(CrimeIncident.crime_rate))
-                .filter(CrimeIncident.neighborhood == NeighborhoodDemographics.neighborhood)
-                .scalar_subquery(),
-                0
-            ).label('crime_rate'),
-            func.coalesce(
-                db.query(func.avg(PropertyAssessment.total_value))
-                .filter(PropertyAssessment.neighborhood == NeighborhoodDemographics.neighborhood)
-                .scalar_subquery(),
-                0
-            ).label('median_home_value')
-        ).all()
-        
-        logger.info(f"Found {len(neighborhoods)} neighborhoods with statistics")
-        logger.info(f"Sample neighborhood names from database: {[nb.neighborhood for nb in neighborhoods[:5]]}")
-        
-        # Read the GeoJSON file
-        geojson_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'raw', 'boston-neighborhoods.geojson')
-        logger.info(f"Reading GeoJSON file from: {geojson_path}")
-        
-        with open(geojson_path, 'r') as f:
-            geojson_data = json.load(f)
-        
-        logger.info(f"GeoJSON file loaded with {len(geojson_data['features'])} features")
-        logger.info(f"Sample neighborhood names from GeoJSON: {[f['properties'].get('name') for f in geojson_data['features'][:5]]}")
-        
-        # Create a dictionary of neighborhood statistics
-        stats_dict = {nb.neighborhood: {
-            'school_count': nb.school_count,
-            'transit_stops': nb.transit_stops,
-            'crime_rate': float(nb.crime_rate),
-            'median_home_value': float(nb.median_home_value)
-        } for nb in neighborhoods}
-        
-        logger.info(f"Sample statistics from database: {list(stats_dict.items())[:3]}")
-        
-        # Update the GeoJSON features with our statistics
-        matched_count = 0
-        for feature in geojson_data['features']:
-            neighborhood_name = feature['properties'].get('neighborhood')
-            if neighborhood_name in stats_dict:
-                feature['properties'].update(stats_dict[neighborhood_name])
-                matched_count += 1
-                logger.info(f"Updated neighborhood {neighborhood_name} with stats: {stats_dict[neighborhood_name]}")
-            else:
-                logger.warning(f"No matching statistics found for neighborhood: {neighborhood_name}")
-                logger.warning(f"Available properties: {feature['properties']}")
-        
-        logger.info(f"Successfully matched {matched_count} neighborhoods with statistics")
-        logger.info("Successfully generated neighborhood boundaries response")
-        return jsonify(geojson_data)
+        version = data_versions.current_key(request_db())
+        if not boundaries_artifact.available(version):
+            logger.warning(f"Neighborhood boundaries artifact missing or stale; building it for data version {version}")
+            build_boundaries(request_db(), version)
+
+        etag = boundaries_artifact.etag(detail)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            accepted = [encoding for encoding in ('br', 'gzip') if request.accept_encodings[encoding]]
+            body, encoding, etag = boundaries_artifact.get(detail, accepted)
+            response = Response(body, mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag, weak=True)
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
     except Exception as e:
         logger.error(f"Error fetching neighborhood boundaries: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to fetch neighborhood boundaries"}), 500
 
 @app.route('/api/affordability', methods=['GET'])
+@cached_endpoint
 def get_affordability():
     """
     API endpoint to calculate and return price-to-income ratios for each neighborhood.
     """
-    db = next(get_db())
+    db = request_db()
     try:
-        # Get city-wide median income by getting all values and calculating median in Python
+        # Get city-wide median income
         incomes = db.query(
             NeighborhoodDemographics.median_family_income
         ).filter(
@@ -176,26 +179,17 @@ def get_affordability():
             logger.error("No income data found")
             return jsonify({"error": "No income data available"}), 500
             
-        income_values = sorted([income[0] for income in incomes])
-        mid = len(income_values) // 2
-        city_median_income = income_values[mid] if len(income_values) % 2 else (income_values[mid-1] + income_values[mid]) / 2
+        city_median_income = median([income[0] for income in incomes])
         logger.info(f"City median income: {city_median_income}")
 
-        # Get city-wide median price by getting all values and calculating median in Python
-        prices = db.query(
-            PropertyAssessment.total_value
-        ).filter(
-            PropertyAssessment.total_value.isnot(None),
-            PropertyAssessment.total_value > 0
-        ).all()
-        
-        if not prices:
+        # Property medians come from the materialized neighborhood stats
+        stats = get_neighborhood_stats(db)
+        city_stats = stats.get(None)
+        if not city_stats or not city_stats['property_count']:
             logger.error("No price data found")
             return jsonify({"error": "No price data available"}), 500
-            
-        price_values = sorted([price[0] for price in prices])
-        mid = len(price_values) // 2
-        city_median_price = price_values[mid] if len(price_values) % 2 else (price_values[mid-1] + price_values[mid]) / 2
+
+        city_median_price = city_stats['median_property_value']
         logger.info(f"City median price: {city_median_price}")
 
         # Get neighborhood-specific data
@@ -212,25 +206,13 @@ def get_affordability():
         neighborhoods_data = []
         total_price_to_income_ratio = 0
 
-        # Calculate median price for each neighborhood
         for n in neighborhoods_raw:
-            # Get all property values for this neighborhood
-            property_values = db.query(
-                PropertyAssessment.total_value
-            ).filter(
-                PropertyAssessment.neighborhood == n.neighborhood,
-                PropertyAssessment.total_value.isnot(None),
-                PropertyAssessment.total_value > 0
-            ).all()
-            
-            if not property_values:
+            neighborhood_stats = stats.get(n.neighborhood)
+            if not neighborhood_stats or not neighborhood_stats['property_count']:
                 logger.warning(f"No property values found for neighborhood {n.neighborhood}")
                 continue
 
-            # Calculate median price
-            values = sorted([p[0] for p in property_values])
-            mid = len(values) // 2
-            median_price = values[mid] if len(values) % 2 else (values[mid-1] + values[mid]) / 2
+            median_price = neighborhood_stats['median_property_value']
 
             if n.median_family_income is None or median_price is None:
                 logger.warning(f"Skipping neighborhood {n.neighborhood} due to missing data")
@@ -266,11 +248,12 @@ def get_affordability():
         return jsonify({"error": "Failed to calculate price-to-income ratios"}), 500
 
 @app.route('/api/neighborhood-summary/<neighborhood>', methods=['GET'])
+@cached_endpoint
 def get_neighborhood_summary(neighborhood):
     """
     API endpoint to get a comprehensive summary of a specific neighborhood.
     """
-    db = next(get_db())
+    db = request_db()
     try:
         # Get demographics with error handling
         demographics = db.query(NeighborhoodDemographics).filter(
@@ -280,75 +263,26 @@ def get_neighborhood_summary(neighborhood):
         if not demographics:
             return jsonify({"error": "Neighborhood not found"}), 404
 
-        # Get property values for median calculation
-        property_values = db.query(
-            PropertyAssessment.total_value,
-            PropertyAssessment.living_area,
-            PropertyAssessment.yr_built
-        ).filter(
-            PropertyAssessment.neighborhood == neighborhood,
-            PropertyAssessment.total_value.isnot(None),
-            PropertyAssessment.total_value > 0
-        ).all()
-
-        total_properties = len(property_values)
-        
-        if total_properties > 0:
-            # Calculate medians
-            values = sorted([p.total_value for p in property_values])
-            areas = sorted([p.living_area for p in property_values if p.living_area is not None])
-            years = sorted([p.yr_built for p in property_values if p.yr_built is not None])
-            
-            mid_value = len(values) // 2
-            mid_area = len(areas) // 2 if areas else 0
-            mid_year = len(years) // 2 if years else 0
-            
-            median_property_value = values[mid_value] if len(values) % 2 else (values[mid_value-1] + values[mid_value]) / 2
-            median_living_area = areas[mid_area] if areas and len(areas) % 2 else (areas[mid_area-1] + areas[mid_area]) / 2 if areas else 0
-            median_year_built = years[mid_year] if years and len(years) % 2 else (years[mid_year-1] + years[mid_year]) / 2 if years else 0
-        else:
-            median_property_value = 0
-            median_living_area = 0
-            median_year_built = 0
-
-        # Get amenities counts with optimized queries
-        schools_count = db.query(func.count(School.id)).filter(
-            School.neighborhood == neighborhood
-        ).scalar()
-
-        mbta_stops_count = db.query(func.count(MBTAStop.id)).filter(
-            MBTAStop.neighborhood == neighborhood
-        ).scalar()
-
-        restaurants_count = db.query(func.count(RestaurantInspection.id)).filter(
-            RestaurantInspection.neighborhood == neighborhood
-        ).scalar()
-
-        # Get crime statistics
-        crime_stats = db.query(
-            func.count(CrimeIncident.id).label('total_crimes'),
-            func.avg(CrimeIncident.crime_rate).label('crime_rate')
-        ).filter(
-            CrimeIncident.neighborhood == neighborhood
-        ).first()
+        # Property, crime and amenity figures come from the materialized stats
+        stats = get_neighborhood_stats(db).get(neighborhood) or {}
 
         # Handle None values and convert to appropriate types
         property_stats_dict = {
-            "median_property_value": float(median_property_value),
-            "total_properties": total_properties,
-            "median_living_area": float(median_living_area),
-            "median_year_built": float(median_year_built),
+            "median_property_value": float(stats.get('median_property_value') or 0),
+            "total_properties": stats.get('property_count') or 0,
+            "median_living_area": float(stats.get('median_living_area') or 0),
+            "median_year_built": float(stats.get('median_year_built') or 0),
         }
 
         crime_stats_dict = {
-            "total_crimes": crime_stats.total_crimes if crime_stats else 0,
-            "crime_rate": float(crime_stats.crime_rate) if crime_stats and crime_stats.crime_rate else 0
+            "total_crimes": stats.get('crime_count') or 0,
+            "crime_rate": float(stats.get('avg_crime_rate') or 0)
         }
 
         amenities_dict = {
-            "schools": schools_count,
-            "mbta_stops": mbta_stops_count,
-            "restaurants": restaurants_count
+            "schools": stats.get('school_count') or 0,
+            "mbta_stops": stats.get('mbta_stops_count') or 0,
+            "restaurants": stats.get('restaurant_count') or 0
         }
 
         return jsonify({
@@ -389,12 +323,13 @@ def get_neighborhood_summary(neighborhood):
         return jsonify({"error": "Failed to fetch neighborhood summary"}), 500
 
 @app.route('/api/search', methods=['GET'])
+@cached_endpoint
 def search_neighborhoods():
     """
     API endpoint to search properties based on filters.
     Returns all properties if no filters are applied.
     """
-    db = next(get_db())
+    db = request_db()
     try:
         # Get query parameters with defaults
         neighborhood = request.args.get('neighborhood', '')
@@ -403,53 +338,14 @@ def search_neighborhoods():
         bedrooms = request.args.get('bedrooms', type=int, default=None)
         bathrooms = request.args.get('bathrooms', type=float, default=None)
 
-        # Build base query to get all properties first
-        base_query = db.query(PropertyAssessment)
-
-        # Apply filters only if they are provided
-        if neighborhood:
-            base_query = base_query.filter(PropertyAssessment.neighborhood == neighborhood)
-        if min_price > 0:
-            base_query = base_query.filter(PropertyAssessment.total_value >= min_price)
-        if max_price < float('inf'):
-            base_query = base_query.filter(PropertyAssessment.total_value <= max_price)
-        if bedrooms is not None:
-            base_query = base_query.filter(PropertyAssessment.bed_rms == bedrooms)
-        if bathrooms is not None:
-            # Calculate total bathrooms (full + half)
-            total_bathrooms = func.coalesce(PropertyAssessment.full_bth, 0) + func.coalesce(PropertyAssessment.hlf_bth, 0) * 0.5
-            base_query = base_query.filter(total_bathrooms == bathrooms)
-
-        # Get all properties for each neighborhood
-        properties = base_query.all()
-        
-        # Group properties by neighborhood
-        neighborhood_properties = {}
-        for prop in properties:
-            if prop.neighborhood not in neighborhood_properties:
-                neighborhood_properties[prop.neighborhood] = []
-            neighborhood_properties[prop.neighborhood].append(prop)
-
-        # Calculate statistics for each neighborhood
-        results = []
-        for neighborhood, props in neighborhood_properties.items():
-            if not props:
-                continue
-
-            # Filter out null and zero values for median price calculation
-            valid_values = [p.total_value for p in props if p.total_value is not None and p.total_value > 0]
-            if valid_values:
-                values = sorted(valid_values)
-                mid = len(values) // 2
-                median_price = values[mid] if len(values) % 2 else (values[mid-1] + values[mid]) / 2
-            else:
-                median_price = 0
-
-            results.append({
-                'neighborhood': neighborhood,
-                'median_price': float(median_price),
-                'property_count': len(valid_values)  # Only count valid properties
-            })
+        # Filter the in-memory columnar copy instead of loading ORM rows
+        results = property_store.get(db).search(
+            neighborhood=neighborhood,
+            min_price=min_price,
+            max_price=max_price,
+            bedrooms=bedrooms,
+            bathrooms=bathrooms
+        )
 
         return jsonify(results)
     except Exception as e:
@@ -458,56 +354,28 @@ def search_neighborhoods():
         return jsonify({"error": "Failed to search properties"}), 500
 
 @app.route('/api/visualizations/neighborhood-comparison', methods=['GET'])
+@cached_endpoint
 def get_neighborhood_comparison():
     """
     API endpoint to get data for neighborhood comparison visualizations.
     """
-    db = next(get_db())
+    db = request_db()
     try:
         neighborhoods = db.query(NeighborhoodDemographics).all()
+        stats = get_neighborhood_stats(db)
         
         comparison_data = []
         for n in neighborhoods:
-            # Get property values for median calculation
-            property_values = db.query(
-                PropertyAssessment.total_value
-            ).filter(
-                PropertyAssessment.neighborhood == n.neighborhood,
-                PropertyAssessment.total_value.isnot(None),
-                PropertyAssessment.total_value > 0
-            ).all()
-            
-            if property_values:
-                values = sorted([p[0] for p in property_values])
-                mid = len(values) // 2
-                median_property_value = values[mid] if len(values) % 2 else (values[mid-1] + values[mid]) / 2
-            else:
-                median_property_value = 0
-            
-            # Get crime data for median calculation
-            crime_rates = db.query(
-                CrimeIncident.crime_rate
-            ).filter(
-                CrimeIncident.neighborhood == n.neighborhood,
-                CrimeIncident.crime_rate.isnot(None)
-            ).all()
-            
-            if crime_rates:
-                rates = sorted([c[0] for c in crime_rates])
-                mid = len(rates) // 2
-                median_crime_rate = rates[mid] if len(rates) % 2 else (rates[mid-1] + rates[mid]) / 2
-            else:
-                median_crime_rate = 0
-            
+            neighborhood_stats = stats.get(n.neighborhood) or {}
             comparison_data.append({
                 "neighborhood": n.neighborhood,
                 "population": n.population,
                 "median_family_income": n.median_family_income,
-                "median_property_value": median_property_value,
-                "median_crime_rate": median_crime_rate,
-                "school_count": db.query(School).filter(School.neighborhood == n.neighborhood).count(),
-                "mbta_stops_count": db.query(MBTAStop).filter(MBTAStop.neighborhood == n.neighborhood).count(),
-                "restaurant_count": db.query(RestaurantInspection).filter(RestaurantInspection.neighborhood == n.neighborhood).count()
+                "median_property_value": neighborhood_stats.get('median_property_value') or 0,
+                "median_crime_rate": neighborhood_stats.get('median_crime_rate') or 0,
+                "school_count": neighborhood_stats.get('school_count') or 0,
+                "mbta_stops_count": neighborhood_stats.get('mbta_stops_count') or 0,
+                "restaurant_count": neighborhood_stats.get('restaurant_count') or 0
             })
         
         return jsonify(comparison_data)
@@ -516,20 +384,21 @@ def get_neighborhood_comparison():
         return jsonify({"error": "Failed to generate neighborhood comparison data"}), 500
 
 @app.route('/api/visualizations/crime-trends', methods=['GET'])
+@cached_endpoint
 def get_crime_trends():
     """
     API endpoint to get data for crime trend visualizations.
     """
-    db = next(get_db())
+    db = request_db()
     try:
         # Get crime data grouped by month and neighborhood
         crimes = db.query(
             CrimeIncident.neighborhood,
-            func.strftime('%Y-%m', CrimeIncident.date).label('month'),
+            month_bucket(CrimeIncident.date).label('month'),
             func.count(CrimeIncident.id).label('crime_count')
         ).group_by(
             CrimeIncident.neighborhood,
-            func.strftime('%Y-%m', CrimeIncident.date)
+            month_bucket(CrimeIncident.date)
         ).all()
         
         # Format the data for visualization
@@ -548,34 +417,23 @@ def get_crime_trends():
         return jsonify({"error": "Failed to generate crime trends data"}), 500
 
 @app.route('/api/visualizations/property-distribution', methods=['GET'])
+@cached_endpoint
 def get_property_distribution():
     """
     API endpoint to get data for property distribution visualizations.
     """
-    db = next(get_db())
+    db = request_db()
     try:
-        neighborhoods = db.query(PropertyAssessment.neighborhood).distinct().all()
+        stats = get_neighborhood_stats(db)
         
         distribution_data = []
-        for n in neighborhoods:
-            # Get property values for this neighborhood
-            property_values = db.query(
-                PropertyAssessment.total_value
-            ).filter(
-                PropertyAssessment.neighborhood == n.neighborhood,
-                PropertyAssessment.total_value.isnot(None),
-                PropertyAssessment.total_value > 0
-            ).all()
-            
-            if property_values:
-                values = sorted([p[0] for p in property_values])
-                mid = len(values) // 2
-                median_value = values[mid] if len(values) % 2 else (values[mid-1] + values[mid]) / 2
-                
+        for neighborhood in sorted(n for n in stats if n is not None):
+            neighborhood_stats = stats[neighborhood]
+            if neighborhood_stats['property_count']:
                 distribution_data.append({
-                    "neighborhood": n.neighborhood,
-                    "property_count": len(values),
-                    "median_value": median_value
+                    "neighborhood": neighborhood,
+                    "property_count": neighborhood_stats['property_count'],
+                    "median_value": neighborhood_stats['median_property_value']
                 })
         
         return jsonify(distribution_data)
@@ -583,12 +441,75 @@ def get_property_distribution():
         logger.error(f"Error generating property distribution data: {str(e)}")
         return jsonify({"error": "Failed to generate property distribution data"}), 500
 
+@app.route('/api/property-percentiles', methods=['GET'])
+@cached_endpoint
+def get_property_percentiles():
+    """
+    API endpoint to get arbitrary property value percentiles.
+    Query parameters:
+      - neighborhood: one or more neighborhoods (repeated or comma-separated); city-wide when omitted
+      - percentiles: comma-separated percentiles between 0 and 100 (default 10,25,50,75,90)
+      - mode: 'approx' (default) merges the materialized t-digests, 'exact' selects from the raw values
+    """
+    db = request_db()
+    try:
+        neighborhoods = [
+            name.strip()
+            for value in request.args.getlist('neighborhood')
+            for name in value.split(',') if name.strip()
+        ]
+        mode = request.args.get('mode', 'approx')
+        try:
+            percentiles = [float(p) for p in request.args.get('percentiles', '10,25,50,75,90').split(',')]
+        except ValueError:
+            return jsonify({"error": "percentiles must be comma-separated numbers"}), 400
+        if mode not in ('approx', 'exact'):
+            return jsonify({"error": "mode must be 'approx' or 'exact'"}), 400
+        if not percentiles or any(p < 0 or p > 100 for p in percentiles):
+            return jsonify({"error": "percentiles must be between 0 and 100"}), 400
+
+        qs = [p / 100 for p in percentiles]
+        if mode == 'exact':
+            query = db.query(PropertyAssessment.total_value).filter(
+                PropertyAssessment.total_value.isnot(None),
+                PropertyAssessment.total_value > 0
+            )
+            if neighborhoods:
+                query = query.filter(PropertyAssessment.neighborhood.in_(neighborhoods))
+            values = [row[0] for row in query.all()]
+            count = len(values)
+            results = exact_quantiles(values, qs)
+        else:
+            stats = get_neighborhood_stats(db)
+            digest = TDigest()
+            for name in neighborhoods or [None]:
+                serialized = (stats.get(name) or {}).get('property_value_digest')
+                if serialized:
+                    digest.merge(TDigest.from_dict(json.loads(serialized)))
+            count = digest.count
+            results = digest.quantiles(qs)
+
+        if count == 0:
+            return jsonify({"error": "No property values found"}), 404
+
+        return jsonify({
+            "neighborhoods": neighborhoods or None,
+            "mode": mode,
+            "property_count": count,
+            "percentiles": {f"{p:g}": value for p, value in zip(percentiles, results)}
+        })
+    except Exception as e:
+        logger.error(f"Error computing property percentiles: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to compute property percentiles"}), 500
+
 @app.route('/api/max-price', methods=['GET'])
+@cached_endpoint
 def get_max_price():
     """
     API endpoint to get the maximum property value in the database.
     """
-    db = next(get_db())
+    db = request_db()
     try:
         max_price = db.query(func.max(PropertyAssessment.total_value)).scalar()
         return jsonify({"max_price": float(max_price) if max_price else 0})
@@ -597,37 +518,178 @@ def get_max_price():
         return jsonify({"error": "Failed to fetch max price"}), 500
 
 @app.route('/api/crime-data', methods=['GET'])
+@cached_endpoint
 def get_crime_data():
-    """API endpoint to retrieve crime data for heatmap visualization."""
-    db = next(get_db())
+    """
+    API endpoint to retrieve crime data for heatmap visualization.
+    Query parameters:
+      - fields: comma-separated projection (default latitude,longitude,type,description,neighborhood)
+      - bbox: min_lon,min_lat,max_lon,max_lat
+      - start, end: ISO dates or datetimes; a bare end date includes that day
+      - limit, after: keyset pagination; returns {"data": [...], "next_cursor": ...}
+      - format: 'json' (default) or 'ndjson' for newline-delimited records
+    Without limit every matching incident is streamed in chunks.
+    """
     try:
-        crimes = db.query(
-            CrimeIncident.latitude,
-            CrimeIncident.longitude,
-            CrimeIncident.offense_code,
-            CrimeIncident.offense_description,
-            CrimeIncident.neighborhood
-        ).filter(
-            CrimeIncident.latitude.isnot(None),
-            CrimeIncident.longitude.isnot(None)
-        ).all()
-        
-        return jsonify([{
-            'latitude': float(crime.latitude),
-            'longitude': float(crime.longitude),
-            'type': crime.offense_code,
-            'description': crime.offense_description,
-            'neighborhood': crime.neighborhood
-        } for crime in crimes])
+        fields = crime_feed.parse_fields(request.args.get('fields'))
+        filters = {
+            'bbox': crime_feed.parse_bbox(request.args.get('bbox')),
+            'start': crime_feed.parse_date(request.args.get('start')),
+            'end': crime_feed.parse_date(request.args.get('end'), end=True),
+            'after': crime_feed.parse_cursor(request.args.get('after')),
+        }
+        limit = crime_feed.parse_limit(request.args.get('limit'))
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            raise ValueError("format must be 'json' or 'ndjson'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if limit is not None:
+        db = request_db()
+        try:
+            records, next_cursor = crime_feed.fetch_page(db, fields, limit, **filters)
+            if output_format == 'ndjson':
+                response = Response(crime_feed.stream_ndjson([records]), mimetype='application/x-ndjson')
+                if next_cursor:
+                    response.headers['X-Next-Cursor'] = next_cursor
+                return response
+            return jsonify({"data": records, "next_cursor": next_cursor})
+        except Exception as e:
+            logger.error(f"Error fetching crime data: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({"error": "Failed to fetch crime data"}), 500
+
+    def generate():
+        # The response outlives the request context, so the stream owns its session
+        db = ReadSessionLocal()
+        try:
+            chunks = crime_feed.iter_chunks(db, fields, **filters)
+            if output_format == 'ndjson':
+                yield from crime_feed.stream_ndjson(chunks)
+            else:
+                yield from crime_feed.stream_json_array(chunks)
+        except Exception as e:
+            logger.error(f"Error streaming crime data: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+        finally:
+            db.close()
+
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'application/json'
+    return Response(generate(), mimetype=mimetype)
+
+@app.route('/api/crime-density', methods=['GET'])
+@cached_endpoint
+def get_crime_density():
+    """
+    API endpoint to get crime counts binned into a square grid for heatmaps.
+    Query parameters:
+      - zoom: map zoom level, picks the grid resolution (default 12)
+      - resolution: explicit grid resolution, overrides zoom
+      - offense_code: one or more offense codes (repeated or comma-separated)
+      - start, end: inclusive month range as YYYY-MM (dates are truncated to their month)
+      - bbox: min_lon,min_lat,max_lon,max_lat
+    Only non-empty cells are returned.
+    """
+    try:
+        zoom = request.args.get('zoom', type=float, default=12)
+        resolution = request.args.get('resolution', type=int, default=None)
+        if resolution is None:
+            resolution = crime_density.resolution_for_zoom(zoom)
+        elif not crime_density.MIN_RESOLUTION <= resolution <= crime_density.MAX_RESOLUTION:
+            raise ValueError(
+                f"resolution must be between {crime_density.MIN_RESOLUTION} and {crime_density.MAX_RESOLUTION}"
+            )
+        offense_codes = [
+            code.strip()
+            for value in request.args.getlist('offense_code')
+            for code in value.split(',') if code.strip()
+        ]
+        start_month = crime_density.parse_month(request.args.get('start'))
+        end_month = crime_density.parse_month(request.args.get('end'))
+        bbox = crime_feed.parse_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = request_db()
+    try:
+        cells = crime_density.density_cells(
+            db, resolution, offense_codes=offense_codes, start_month=start_month,
+            end_month=end_month, bbox=bbox
+        )
+        return jsonify({
+            "resolution": resolution,
+            "cell_count": len(cells),
+            "crime_count": sum(cell['count'] for cell in cells),
+            "cells": cells
+        })
+    except Exception as e:
+        logger.error(f"Error fetching crime density: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to fetch crime density"}), 500
+
+@app.route('/tiles/<layer>/<int:z>/<int:x>/<int:y>.pbf', methods=['GET'])
+def get_vector_tile(layer, z, x, y):
+    """
+    Mapbox Vector Tile of one point layer (crimes, schools, stops or
+    restaurants). Points are clustered at low zoom levels.
+    """
+    if layer not in POINT_LAYERS:
+        return jsonify({"error": f"Unknown layer '{layer}'"}), 404
+    if not valid_tile(z, x, y):
+        return jsonify({"error": "Invalid tile coordinates"}), 400
+
+    db = request_db()
+    try:
+        data = tile_service.get_tile(db, layer, z, x, y)
+        if not data:
+            # Map clients render 204 responses as empty tiles
+            return Response(status=204)
+        return Response(data, mimetype='application/vnd.mapbox-vector-tile')
+    except Exception as e:
+        logger.error(f"Error building tile {layer}/{z}/{x}/{y}: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to build tile"}), 500
+
+@app.route('/api/nearby', methods=['GET'])
+def get_nearby():
+    """
+    Amenities around a point, e.g. a parcel. Query parameters:
+    - lat, lon: the point (required)
+    - radius: search radius in meters (default 800 unless k is given)
+    - k: return only the k nearest points per layer
+    - layers: comma-separated point layers (default schools,stops,restaurants)
+    """
+    try:
+        lat, lon = nearby.parse_point(request.args.get('lat'), request.args.get('lon'))
+        k = nearby.parse_k(request.args.get('k'))
+        radius = nearby.parse_radius(
+            request.args.get('radius'), default=None if k else nearby.DEFAULT_RADIUS_M
+        )
+        layers = nearby.parse_layers(request.args.get('layers'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = request_db()
+    try:
+        results = nearby.nearby_index.nearby(db, lat, lon, layers, radius=radius, k=k)
+        return jsonify({
+            "center": {"latitude": lat, "longitude": lon},
+            "radius_m": radius,
+            "k": k,
+            "layers": results
+        })
     except Exception as e:
-        logger.error(f"Error fetching crime data: {str(e)}")
+        logger.error(f"Error fetching nearby amenities: {str(e)}")
         logger.error(traceback.format_exc())
-        return jsonify({"error": "Failed to fetch crime data"}), 500
+        return jsonify({"error": "Failed to fetch nearby amenities"}), 500
 
 @app.route('/api/schools', methods=['GET'])
+@cached_endpoint
 def get_schools():
     """API endpoint to retrieve school locations and details."""
-    db = next(get_db())
+    db = request_db()
     try:
         # Log the query being executed
         logger.info("Fetching schools from database...")
@@ -670,9 +732,10 @@ def get_schools():
         return jsonify({"error": "Failed to fetch schools"}), 500
 
 @app.route('/api/transit-stops', methods=['GET'])
+@cached_endpoint
 def get_transit_stops():
     """API endpoint to retrieve MBTA transit stops."""
-    db = next(get_db())
+    db = request_db()
     try:
         stops = db.query(
             MBTAStop.id,
@@ -699,9 +762,10 @@ def get_transit_stops():
         return jsonify({"error": "Failed to fetch transit stops"}), 500
 
 @app.route('/api/restaurants', methods=['GET'])
+@cached_endpoint
 def get_restaurants():
     """API endpoint to retrieve restaurant data for map visualization."""
-    db = next(get_db())
+    db = request_db()
     try:
         restaurants = db.query(
             RestaurantInspection.latitude,
@@ -725,5 +789,7 @@ def get_restaurants():
         return jsonify({"error": "Failed to fetch restaurant data"}), 500
 
 if __name__ == '__main__':
-    logger.info("Starting Flask server...")
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    # Precompute the cached payloads now and after every data load
+    start_background_warmer(app)
+    logger.info("Starting Flask development server...")
+    app.run(debug=DEBUG, host='0.0.0.0', port=int(os.getenv('PORT', 5001)))
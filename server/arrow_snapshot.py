@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from sqlalchemy.orm import Session
+from dbConnection import DATA_PROCESSED_DIR, SessionLocal
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# One directory of Arrow IPC files per data version key (see
+# data_version_key, so a recreated database never reuses the directory of an
+# earlier one), and a manifest naming the current one. The manifest is replaced last, so readers never see a partial
+# snapshot.
+SNAPSHOT_DIR = DATA_PROCESSED_DIR / 'snapshot'
+MANIFEST_NAME = 'manifest.json'
+PROPERTY_TABLE = 'properties'
+# Point layer columns holding feature properties
+PROPERTY_PREFIX = 'property.'
+
+def _write_atomic(path, write):
+    """Call write(file) on a temporary file, then rename it to path."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _write_table(path, table):
+    """Write an uncompressed Arrow IPC file, which readers can memory-map without decoding."""
+    def write(f):
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+    _write_atomic(path, write)
+
+def property_table(snapshot):
+    """Arrow table of a PropertySnapshot's columns; neighborhood names go in the schema metadata."""
+    table = pa.table({
+        'neighborhood': pa.array(snapshot.codes, type=pa.int32()),
+        'total_value': pa.array(snapshot.values, type=pa.float64()),
+        'bedrooms': pa.array(snapshot.bedrooms, type=pa.float64()),
+        'bathrooms': pa.array(snapshot.bathrooms, type=pa.float64()),
+    })
+    return table.replace_schema_metadata({'names': json.dumps(snapshot.names)})
+
+def point_table(layer):
+    """Arrow table of a PointLayer, keeping its x order."""
+    columns = {
+        'id': pa.array(layer.ids, type=pa.int64()),
+        'longitude': pa.array(layer.lon, type=pa.float64()),
+        'latitude': pa.array(layer.lat, type=pa.float64()),
+        'x': pa.array(layer.x, type=pa.float64()),
+        'y': pa.array(layer.y, type=pa.float64()),
+    }
+    for key, values in layer.properties.items():
+        columns[PROPERTY_PREFIX + key] = pa.array(list(values))
+    return pa.table(columns)
+
+def load_manifest(directory=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def publish_snapshot(db: Session, version, directory=SNAPSHOT_DIR):
+    """
+    Write the property table and every point layer as Arrow IPC files for a
+    data version key and make them the current snapshot. Directories of older
+    versions are removed, except the one being replaced, which workers may
+    still be reading.
+    """
+    if pa is None:
+        logger.warning("pyarrow is not installed; skipping the Arrow snapshot")
+        return None
+
+    # Imported here: the stores import this module to read the snapshot
+    from property_store import PropertySnapshot
+    from spatial_index import POINT_LAYERS, PointLayer
+
+    version_dir = os.path.join(directory, str(version))
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.makedirs(version_dir)
+
+    tables = {PROPERTY_TABLE: property_table(PropertySnapshot.from_db(db, version))}
+    for name in POINT_LAYERS:
+        tables[name] = point_table(PointLayer.from_db(db, name))
+
+    files = {}
+    for name, table in tables.items():
+        files[name] = f'{name}.arrow'
+        _write_table(os.path.join(version_dir, files[name]), table)
+
+    previous = load_manifest(directory)
+    manifest = {'version': str(version), 'tables': files}
+    _write_atomic(
+        os.path.join(directory, MANIFEST_NAME),
+        lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8'))
+    )
+
+    keep = {str(version), str(previous['version']) if previous else None}
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path) and entry not in keep:
+            # Workers that still map these files keep their pages until they reload
+            shutil.rmtree(path, ignore_errors=True)
+
+    logger.info(
+        f"Arrow snapshot for data version {version} published: "
+        + ", ".join(f"{name} {table.num_rows} rows" for name, table in tables.items())
+    )
+    return manifest
+
+def refresh_snapshot(db: Session, version):
+    """Publish the snapshot, logging instead of raising on failure."""
+    try:
+        return publish_snapshot(db, version)
+    except Exception as e:
+        logger.error(f"Error publishing the Arrow snapshot: {e}")
+        return None
+
+def read_table(name, version, directory=SNAPSHOT_DIR):
+    """
+    Memory-map a table of the current snapshot. Returns None when pyarrow is
+    missing or the snapshot does not belong to the given data version key, in
+    which case callers read the database instead.
+    """
+    if pa is None:
+        return None
+    manifest = load_manifest(directory)
+    if not manifest or manifest['version'] != str(version) or name not in manifest['tables']:
+        return None
+    path = os.path.join(directory, str(version), manifest['tables'][name])
+    try:
+        # The table's buffers point into the mapping, so every process reading
+        # the file shares the same page cache pages
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except (OSError, pa.ArrowInvalid) as e:
+        logger.warning(f"Could not read snapshot table {path}: {e}")
+        return None
+
+def column_array(table, name):
+    """A numeric column as a NumPy array, without copying when it is stored in a single chunk."""
+    column = table.column(name)
+    if column.num_chunks == 1 and column.null_count == 0:
+        return column.chunk(0).to_numpy(zero_copy_only=True)
+    return column.to_numpy()
+
+class ArrowValues:
+    """
+    Read-only sequence over an Arrow column that converts single values to
+    Python objects on access, so string columns stay in the mapped file.
+    """
+
+    def __init__(self, column):
+        self.column = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+
+    def __len__(self):
+        return len(self.column)
+
+    def __getitem__(self, index):
+        return self.column[int(index)].as_py()
+
+if __name__ == "__main__":
+    from data_version import get_data_version_key
+    session = SessionLocal()
+    try:
+        publish_snapshot(session, get_data_version_key(session))
+    finally:
+        session.close()
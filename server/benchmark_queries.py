@@ -0,0 +1,123 @@
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from dbConnection import DATA_PROCESSED_DIR
+from migrations import apply_migrations, drop_managed_indexes
+from models import NeighborhoodDemographics, PropertyAssessment, CrimeIncident, School, MBTAStop, RestaurantInspection
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+def query_property_values(db, neighborhood):
+    """Property values used by the neighborhood summary and affordability endpoints."""
+    return db.query(
+        PropertyAssessment.total_value,
+        PropertyAssessment.living_area,
+        PropertyAssessment.yr_built
+    ).filter(
+        PropertyAssessment.neighborhood == neighborhood,
+        PropertyAssessment.total_value.isnot(None),
+        PropertyAssessment.total_value > 0
+    ).all()
+
+def query_crime_stats(db, neighborhood):
+    """Crime totals used by the neighborhood summary endpoint."""
+    return db.query(
+        func.count(CrimeIncident.id),
+        func.avg(CrimeIncident.crime_rate)
+    ).filter(CrimeIncident.neighborhood == neighborhood).first()
+
+def query_amenity_counts(db, neighborhood):
+    """School, MBTA stop and restaurant counts for one neighborhood."""
+    return (
+        db.query(func.count(School.id)).filter(School.neighborhood == neighborhood).scalar(),
+        db.query(func.count(MBTAStop.id)).filter(MBTAStop.neighborhood == neighborhood).scalar(),
+        db.query(func.count(RestaurantInspection.id)).filter(RestaurantInspection.neighborhood == neighborhood).scalar(),
+    )
+
+def query_boundary_stats(db, neighborhood=None):
+    """Correlated subqueries used by the neighborhood boundaries endpoint."""
+    return db.query(
+        NeighborhoodDemographics.neighborhood,
+        db.query(func.count(School.id))
+        .filter(School.neighborhood == NeighborhoodDemographics.neighborhood)
+        .scalar_subquery(),
+        db.query(func.count(MBTAStop.id))
+        .filter(MBTAStop.neighborhood == NeighborhoodDemographics.neighborhood)
+        .scalar_subquery(),
+        db.query(func.avg(CrimeIncident.crime_rate))
+        .filter(CrimeIncident.neighborhood == NeighborhoodDemographics.neighborhood)
+        .scalar_subquery(),
+        db.query(func.avg(PropertyAssessment.total_value))
+        .filter(PropertyAssessment.neighborhood == NeighborhoodDemographics.neighborhood)
+        .scalar_subquery()
+    ).all()
+
+QUERIES = [
+    ('property values by neighborhood', query_property_values),
+    ('crime stats by neighborhood', query_crime_stats),
+    ('amenity counts by neighborhood', query_amenity_counts),
+    ('boundary correlated subqueries', query_boundary_stats),
+]
+
+def time_queries(session_factory, neighborhood, repeat):
+    """Run each benchmark query repeat times and return the median latency in ms."""
+    timings = {}
+    db = session_factory()
+    try:
+        for label, query in QUERIES:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query(db, neighborhood)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = statistics.median(samples)
+    finally:
+        db.close()
+    return timings
+
+def main(argv=None):
+    """Benchmark the neighborhood-keyed queries on a copy of the database with and without indexes."""
+    parser = argparse.ArgumentParser(description="Benchmark neighborhood queries before and after the index migration.")
+    parser.add_argument('--db', default=str(DATA_PROCESSED_DIR / 'real_estate.db'), help="SQLite database to benchmark")
+    parser.add_argument('--neighborhood', default=None, help="Neighborhood to filter on (default: the first one found)")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per query (default: 20)")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Work on a copy so the benchmark never touches the live database
+        db_copy = os.path.join(tmp_dir, 'benchmark.db')
+        shutil.copyfile(args.db, db_copy)
+        bench_engine = create_engine(f"sqlite:///{db_copy}")
+        session_factory = sessionmaker(bind=bench_engine)
+
+        neighborhood = args.neighborhood
+        if neighborhood is None:
+            db = session_factory()
+            try:
+                neighborhood = db.query(NeighborhoodDemographics.neighborhood).limit(1).scalar()
+            finally:
+                db.close()
+
+        drop_managed_indexes(bench_engine)
+        before = time_queries(session_factory, neighborhood, args.repeat)
+        apply_migrations(bench_engine)
+        after = time_queries(session_factory, neighborhood, args.repeat)
+        bench_engine.dispose()
+
+    print(f"Neighborhood: {neighborhood} (median of {args.repeat} runs)")
+    print(f"{'query':<36}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for label, _ in QUERIES:
+        speedup = before[label] / after[label] if after[label] > 0 else float('inf')
+        print(f"{label:<36}{before[label]:>14.2f}{after[label]:>14.2f}{speedup:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import logging
+import statistics
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = [
+    '/api/neighborhoods',
+    '/api/affordability',
+    '/api/visualizations/neighborhood-comparison',
+    '/api/visualizations/crime-trends',
+    '/api/neighborhood-boundaries',
+    '/api/crime-data',
+    '/api/schools',
+    '/api/transit-stops',
+]
+
+# Request headers for each scenario: an uncompressed, unconditional client (the
+# behaviour before the response layer), a compressing client, and a client
+# revalidating the body it already holds
+SCENARIOS = [
+    ('before', {}),
+    ('compressed', {'Accept-Encoding': 'gzip, br'}),
+    ('revalidated', {'Accept-Encoding': 'gzip, br'}),
+]
+
+def fetch(client, path, headers):
+    """Issue one request; returns (status, body bytes on the wire, ETag, latency in ms)."""
+    start = time.perf_counter()
+    response = client.get(path, headers=headers)
+    size = len(response.get_data())
+    elapsed = (time.perf_counter() - start) * 1000
+    return response.status_code, size, response.headers.get('ETag'), elapsed
+
+def benchmark(client, path, repeat):
+    """Median latency and body size of each scenario for one endpoint."""
+    results = {}
+    _, _, etag, _ = fetch(client, path, SCENARIOS[1][1])
+    for label, headers in SCENARIOS:
+        if label == 'revalidated' and etag:
+            headers = dict(headers, **{'If-None-Match': etag})
+        samples = [fetch(client, path, headers) for _ in range(repeat)]
+        results[label] = (samples[-1][0], samples[-1][1], statistics.median(s[3] for s in samples))
+    return results
+
+def main(argv=None):
+    """Compare bytes on the wire and latency with and without compression and conditional GET."""
+    parser = argparse.ArgumentParser(description="Benchmark API response sizes and latency.")
+    parser.add_argument('--repeat', type=int, default=5, help="Requests per endpoint and scenario (default: 5)")
+    parser.add_argument('endpoints', nargs='*', default=ENDPOINTS, help="Endpoints to request")
+    args = parser.parse_args(argv)
+
+    # Importing the app initializes the database and in-memory stores
+    from app import app
+    logging.getLogger().setLevel(logging.WARNING)
+    client = app.test_client()
+
+    print(f"{'endpoint':<46}" + ''.join(f"{label + ' (B)':>18}{'ms':>9}" for label, _ in SCENARIOS))
+    for path in args.endpoints:
+        results = benchmark(client, path, args.repeat)
+        row = f"{path:<46}"
+        for label, _ in SCENARIOS:
+            status, size, latency = results[label]
+            size_text = f"{size}" if status == 200 else f"{size} ({status})"
+            row += f"{size_text:>18}{latency:>9.1f}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+from sqlalchemy.orm import Session
+from dbConnection import PROJECT_ROOT, DATA_PROCESSED_DIR, SessionLocal
+from data_version import get_data_version_key
+from neighborhood_stats import get_neighborhood_stats
+from models import NeighborhoodDemographics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+GEOJSON_PATH = os.path.join(PROJECT_ROOT, 'data', 'raw', 'boston-neighborhoods.geojson')
+ARTIFACT_DIR = DATA_PROCESSED_DIR / 'boundaries'
+MANIFEST_NAME = 'manifest.json'
+
+# Detail level -> (Douglas-Peucker tolerance in degrees, coordinate decimals).
+# At Boston's latitude 0.00001 degrees (5 decimals) is about 1m.
+DETAIL_LEVELS = {
+    'full': (0.0, 6),
+    'high': (0.00005, 5),
+    'medium': (0.0002, 5),
+    'low': (0.001, 4),
+}
+DEFAULT_DETAIL = 'full'
+
+# Content-Encoding -> artifact file suffix, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz', 'identity': ''}
+
+def _write_atomic(path, data):
+    """Write bytes to path through a temporary file and a rename."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def boundary_stats(db: Session):
+    """The statistics attached to each neighborhood feature."""
+    stats = get_neighborhood_stats(db)
+    stats_dict = {}
+    for (name,) in db.query(NeighborhoodDemographics.neighborhood).all():
+        neighborhood_stats = stats.get(name) or {}
+        stats_dict[name] = {
+            'school_count': neighborhood_stats.get('school_count') or 0,
+            'transit_stops': neighborhood_stats.get('mbta_stops_count') or 0,
+            'crime_rate': float(neighborhood_stats.get('avg_crime_rate') or 0),
+            'median_home_value': float(neighborhood_stats.get('avg_property_value') or 0)
+        }
+    return stats_dict
+
+def simplify_geometry(geometry, tolerance, decimals):
+    """Douglas-Peucker simplify a GeoJSON geometry and round its coordinates."""
+    geom = shape(geometry)
+    if tolerance:
+        geom = geom.simplify(tolerance, preserve_topology=True)
+    return mapping(shapely.transform(geom, lambda coords: np.round(coords, decimals)))
+
+def build_boundaries(db: Session, version=None, source=GEOJSON_PATH, out_dir=ARTIFACT_DIR):
+    """
+    Write one enriched, simplified GeoJSON artifact per detail level, each with
+    gzip (and brotli when available) variants, plus a manifest of ETags and
+    the data version key the statistics belong to (the current one by default).
+    Returns the manifest.
+    """
+    if version is None:
+        version = get_data_version_key(db)
+    with open(source, 'r') as f:
+        geojson_data = json.load(f)
+    stats_dict = boundary_stats(db)
+
+    unmatched = [
+        feature['properties'].get('neighborhood') for feature in geojson_data['features']
+        if feature['properties'].get('neighborhood') not in stats_dict
+    ]
+    if unmatched:
+        logger.warning(f"No statistics found for neighborhoods: {unmatched}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    levels = {}
+    for level, (tolerance, decimals) in DETAIL_LEVELS.items():
+        features = []
+        for feature in geojson_data['features']:
+            properties = dict(feature['properties'])
+            properties.update(stats_dict.get(properties.get('neighborhood'), {}))
+            features.append({
+                **feature,
+                'geometry': simplify_geometry(feature['geometry'], tolerance, decimals),
+                'properties': properties
+            })
+        body = json.dumps({**geojson_data, 'features': features}, separators=(',', ':')).encode('utf-8')
+
+        base = os.path.join(out_dir, f'boundaries-{level}.json')
+        _write_atomic(base, body)
+        _write_atomic(base + ENCODINGS['gzip'], gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(base + ENCODINGS['br'], brotli.compress(body, quality=11))
+
+        levels[level] = {
+            'file': os.path.basename(base),
+            'etag': hashlib.sha256(body).hexdigest()[:32],
+            'size': len(body),
+            'encodings': [e for e in ENCODINGS if e != 'br' or brotli is not None],
+        }
+    manifest = {'version': version, 'levels': levels}
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+    logger.info(
+        f"Neighborhood boundaries for data version {version} built: "
+        + ", ".join(f"{level} {entry['size']} bytes" for level, entry in levels.items())
+    )
+    return manifest
+
+def refresh_boundaries(db: Session, version=None):
+    """Rebuild the boundaries artifacts, logging instead of raising on failure."""
+    try:
+        return build_boundaries(db, version)
+    except Exception as e:
+        logger.error(f"Error building neighborhood boundaries: {e}")
+        return None
+
+class BoundariesArtifact:
+    """
+    In-memory copy of the built artifacts. Reloaded when the manifest file
+    changes, so serving never touches the database.
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR):
+        self.directory = directory
+        self._mtime = None
+        self._manifest = {}
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        mtime = os.stat(manifest_path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(manifest_path, 'rb') as f:
+                manifest = json.load(f)
+            bodies = {}
+            for level, entry in manifest['levels'].items():
+                for encoding in entry['encodings']:
+                    with open(os.path.join(self.directory, entry['file'] + ENCODINGS[encoding]), 'rb') as f:
+                        bodies[level, encoding] = f.read()
+            self._manifest, self._bodies, self._mtime = manifest, bodies, mtime
+
+    def available(self, version):
+        """
+        Whether an artifact has been built for the given data version key.
+        Artifacts of another version (or of another database) are stale.
+        """
+        try:
+            self._load()
+        except (OSError, ValueError, KeyError):
+            return False
+        return self._manifest.get('version') == version
+
+    def get(self, level, accepted_encodings):
+        """
+        Return (body, content encoding, etag) for a detail level, picking the
+        preferred encoding the client accepts.
+        """
+        self._load()
+        entry = self._manifest['levels'][level]
+        for encoding in ENCODINGS:
+            if encoding in entry['encodings'] and (encoding == 'identity' or encoding in accepted_encodings):
+                return self._bodies[level, encoding], encoding, entry['etag']
+
+    def etag(self, level):
+        """ETag of a detail level, shared by all of its encodings."""
+        self._load()
+        return self._manifest['levels'][level]['etag']
+
+boundaries_artifact = BoundariesArtifact()
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        build_boundaries(session)
+    finally:
+        session.close()
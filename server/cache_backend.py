@@ -0,0 +1,337 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from flask_caching.backends.base import BaseCache
+from dbConnection import PROJECT_ROOT
+from data_version import current_data_version, is_older_version
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', os.path.join(PROJECT_ROOT, 'data', 'cache', 'cache.sqlite'))
+# Set to use a Redis server as the shared tier instead of the SQLite store
+REDIS_URL = os.getenv('REDIS_URL')
+LRU_MAX_BYTES = int(os.getenv('CACHE_LRU_MAX_BYTES', 64 * 1024 * 1024))
+
+# Shared-store keys coordinating cache warm-up across workers
+PUBLISHED_VERSION_KEY = 'meta:published_version'
+WARMING_KEY = 'meta:warming'
+# Prefix of the keys recording when each unpublished data version was first seen
+PENDING_KEY_PREFIX = 'meta:pending:'
+
+# Seconds between data version checks of the background warmer; 0 disables it
+WARM_INTERVAL = float(os.getenv('CACHE_WARM_INTERVAL', 30))
+
+# Seconds a new data version keeps being answered with the published payloads
+# before any warm-up has started: enough for a background warmer to notice it
+# (its poll interval plus the 5s version throttle) and take the lock
+STALE_GRACE = 2 * WARM_INTERVAL + 10
+
+# WSGI environ key the warmer sets to render responses for an unpublished version
+WARM_VERSION_ENVIRON = 'cache_warmer.version'
+# WSGI environ key marking requests answered from an older version's entries
+STALE_VERSION_ENVIRON = 'cache_backend.stale_version'
+
+# Expired rows are purged from the SQLite store once every this many writes
+PURGE_EVERY = 1000
+
+class LRUCache:
+    """
+    In-process LRU of serialized values bounded by their total size in bytes.
+    Entries carry an absolute expiry time (0 for none).
+    """
+
+    def __init__(self, max_bytes=LRU_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=0):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete(self, key):
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(entry[0])
+        return True
+
+class SQLiteStore:
+    """
+    Shared key-value store in a SQLite file, usable by every worker on the
+    host. Implements the subset of the redis-py client API the cache uses
+    (get, set with ex, delete, exists, flushdb) so a Redis client can replace it.
+    """
+
+    def __init__(self, path=CACHE_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        """
+        This thread's connection, opened on first use. Connections are never
+        shared with forked children (gunicorn workers forked from a preloading
+        master): a thread-local inherited from another process is replaced.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ex=None, nx=False):
+        """Store a value; with nx only when the key is absent (returns None if it exists)."""
+        expires_at = time.time() + ex if ex else None
+        conn = self._connection()
+        if nx:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, time.time()))
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, sqlite3.Binary(value), expires_at)
+            ).rowcount
+            return True if inserted else None
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, sqlite3.Binary(value), expires_at)
+        )
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge_expired()
+        return True
+
+    def delete(self, *keys):
+        if not keys:
+            return 0
+        placeholders = ','.join('?' for _ in keys)
+        return self._connection().execute(f'DELETE FROM cache WHERE key IN ({placeholders})', keys).rowcount
+
+    def exists(self, *keys):
+        return sum(self.get(key) is not None for key in keys)
+
+    def flushdb(self):
+        self._connection().execute('DELETE FROM cache')
+        return True
+
+    def purge_expired(self):
+        """Delete expired entries; returns how many were removed."""
+        return self._connection().execute(
+            'DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),)
+        ).rowcount
+
+def shared_store():
+    """The shared cache tier: Redis when REDIS_URL is set, the SQLite store otherwise."""
+    if REDIS_URL:
+        if redis is None:
+            raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+        return redis.Redis.from_url(REDIS_URL)
+    return SQLiteStore()
+
+class TieredCache(BaseCache):
+    """
+    Flask-Caching backend with an in-process LRU in front of a shared store.
+    Reads fall through to the shared store and promote hits into the LRU;
+    writes go to both tiers.
+    """
+
+    def __init__(self, default_timeout=300, store=None, max_bytes=LRU_MAX_BYTES):
+        super().__init__(default_timeout=default_timeout)
+        self.local = LRUCache(max_bytes)
+        self.store = store if store is not None else shared_store()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        return cls(*args, **kwargs)
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else 0
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            try:
+                value = self.store.get(key)
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for {key}: {e}")
+                return None
+            if value is None:
+                return None
+            # The shared store keeps the expiry; give the local copy the default timeout
+            self.local.set(key, value, self._expires_at(None))
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        timeout = self._normalize_timeout(timeout)
+        self.local.set(key, data, self._expires_at(timeout))
+        try:
+            self.store.set(key, data, ex=timeout or None)
+        except Exception as e:
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        try:
+            return bool(self.store.delete(key))
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed for {key}: {e}")
+            return False
+
+    def has(self, key):
+        if self.local.get(key) is not None:
+            return True
+        try:
+            return bool(self.store.exists(key))
+        except Exception as e:
+            logger.warning(f"Shared cache lookup failed for {key}: {e}")
+            return False
+
+    def clear(self):
+        self.local.clear()
+        try:
+            self.store.flushdb()
+        except Exception as e:
+            logger.warning(f"Shared cache clear failed: {e}")
+            return False
+        return True
+
+    def published_version(self):
+        """Key of the last data version whose payloads were fully warmed, or None."""
+        value = self.store.get(PUBLISHED_VERSION_KEY)
+        return value.decode() if value is not None else None
+
+    def publish_version(self, version):
+        self.store.set(PUBLISHED_VERSION_KEY, str(version).encode())
+
+    def begin_warming(self, version, ttl):
+        """Take the warm-up lock for a version; False when another process holds it."""
+        return bool(self.store.set(WARMING_KEY, str(version).encode(), ex=ttl, nx=True))
+
+    def end_warming(self):
+        self.store.delete(WARMING_KEY)
+
+    def _pending_seconds(self, data_version):
+        """Seconds since a data version was first seen unpublished by any worker."""
+        key = f'{PENDING_KEY_PREFIX}{data_version}'
+        value = self.store.get(key)
+        if value is None:
+            self.store.set(key, repr(time.time()).encode(), ex=int(STALE_GRACE) + 60, nx=True)
+            value = self.store.get(key)
+        return time.time() - float(value) if value is not None else 0.0
+
+    def served_version(self, data_version):
+        """
+        Data version whose cache entries are served. Until newer data has been
+        warmed and published this is the last published version, so clients
+        get the stale payloads instead of cold misses: while a warm-up runs,
+        and, when background warmers are enabled, for STALE_GRACE seconds
+        before one starts. Warm-ups that never come do not pin the old data.
+        """
+        try:
+            published = self.published_version()
+            if published is None or not is_older_version(published, data_version):
+                return data_version
+            if self.store.get(WARMING_KEY) is not None:
+                return published
+            if WARM_INTERVAL > 0 and self._pending_seconds(data_version) < STALE_GRACE:
+                return published
+        except Exception as e:
+            logger.warning(f"Could not read the published cache version: {e}")
+        return data_version
+
+def cache_backend_for(app=None):
+    """The cache backend instance registered on the app."""
+    return next(iter((app or current_app).extensions['cache'].values()))
+
+def served_data_version():
+    """Data version key identifying the payloads served to clients (cache keys and ETags)."""
+    data_version = current_data_version()
+    backend = cache_backend_for()
+    if isinstance(backend, TieredCache):
+        return backend.served_version(data_version)
+    return data_version
+
+def versioned_cache_key(*args, **kwargs):
+    """
+    Cache key for a GET endpoint: the served data version, the path and the
+    sorted query string. Bumping the data version makes every older entry
+    unreachable once the new version is served. Requests served an older
+    version than the loaded one are flagged so their responses, computed from
+    the new data, are not stored under the old version's key.
+    """
+    version = request.environ.get(WARM_VERSION_ENVIRON)
+    if version is None:
+        version = served_data_version()
+        request.environ[STALE_VERSION_ENVIRON] = version != current_data_version()
+    query = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    return f"v{version}:{request.path}?{query}"
+
+def cacheable_response(response):
+    """
+    Only cache complete, successful responses (no errors or streamed bodies)
+    rendered for the version their cache key names.
+    """
+    if isinstance(response, tuple) or request.environ.get(STALE_VERSION_ENVIRON):
+        return False
+    return getattr(response, 'status_code', 200) == 200 and not getattr(response, 'is_streamed', False)
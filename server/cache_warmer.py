@@ -0,0 +1,132 @@
+import argparse
+import logging
+import threading
+import time
+from urllib.parse import quote
+from dbConnection import ReadSessionLocal
+from data_version import get_data_version_key
+from cache_backend import TieredCache, WARM_INTERVAL, WARM_VERSION_ENVIRON, cache_backend_for
+from crime_density import MAX_RESOLUTION, MIN_RESOLUTION, GRID_OFFSET
+from models import NeighborhoodDemographics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Payloads that do not depend on a neighborhood
+WARM_PATHS = [
+    '/api/neighborhoods',
+    '/api/affordability',
+    '/api/visualizations/neighborhood-comparison',
+    '/api/visualizations/crime-trends',
+    '/api/visualizations/property-distribution',
+    '/api/property-percentiles',
+    '/api/max-price',
+    '/api/search',
+    '/api/schools',
+    '/api/transit-stops',
+] + [
+    f'/api/crime-density?zoom={zoom}'
+    for zoom in range(MIN_RESOLUTION - GRID_OFFSET, MAX_RESOLUTION - GRID_OFFSET + 1)
+]
+
+# Seconds another process may hold the warm-up lock before it is considered dead
+WARM_LOCK_TTL = 600
+
+def warm_paths():
+    """Every path to precompute: the shared payloads plus one summary per neighborhood."""
+    db = ReadSessionLocal()
+    try:
+        neighborhoods = [name for (name,) in db.query(NeighborhoodDemographics.neighborhood).all() if name]
+    finally:
+        db.close()
+    return WARM_PATHS + [f'/api/neighborhood-summary/{quote(name)}' for name in neighborhoods]
+
+def warm_cache(app=None, version=None):
+    """
+    Render every warm path into the cache for a data version key (the current
+    one by default), then publish it. Until then clients keep getting the payloads
+    of the previously published version. Returns a dict of path ->
+    (status, milliseconds), or None when another process is already warming.
+    """
+    if app is None:
+        from app import app
+
+    if version is None:
+        db = ReadSessionLocal()
+        try:
+            version = get_data_version_key(db)
+        finally:
+            db.close()
+
+    backend = cache_backend_for(app)
+    if not isinstance(backend, TieredCache):
+        logger.warning("Cache warming needs the tiered cache backend; skipping")
+        return None
+    if not backend.begin_warming(version, WARM_LOCK_TTL):
+        logger.info(f"Cache warm-up already in progress; skipping data version {version}")
+        return None
+
+    try:
+        client = app.test_client()
+        timings = {}
+        start = time.perf_counter()
+        for path in warm_paths():
+            request_start = time.perf_counter()
+            response = client.get(path, environ_overrides={WARM_VERSION_ENVIRON: version})
+            timings[path] = (response.status_code, (time.perf_counter() - request_start) * 1000)
+            if response.status_code != 200:
+                logger.warning(f"Warming {path} returned {response.status_code}")
+        backend.publish_version(version)
+        logger.info(
+            f"Cache warmed for data version {version}: {len(timings)} payloads "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return timings
+    finally:
+        backend.end_warming()
+
+class BackgroundWarmer(threading.Thread):
+    """Daemon thread that warms the cache whenever a new data version is loaded."""
+
+    def __init__(self, app, interval=WARM_INTERVAL):
+        super().__init__(name='cache-warmer', daemon=True)
+        self.app = app
+        self.interval = interval
+
+    def run(self):
+        while True:
+            try:
+                db = ReadSessionLocal()
+                try:
+                    version = get_data_version_key(db)
+                finally:
+                    db.close()
+                if cache_backend_for(self.app).published_version() != version:
+                    warm_cache(self.app, version)
+            except Exception as e:
+                logger.error(f"Background cache warm-up failed: {e}")
+            time.sleep(self.interval)
+
+def start_background_warmer(app, interval=WARM_INTERVAL):
+    """Start the background warmer unless CACHE_WARM_INTERVAL is 0."""
+    if interval <= 0:
+        return None
+    warmer = BackgroundWarmer(app, interval)
+    warmer.start()
+    return warmer
+
+def main(argv=None):
+    """Warm the shared cache for the currently loaded data and report the timings."""
+    parser = argparse.ArgumentParser(description="Precompute the cached API payloads for the loaded data.")
+    parser.parse_args(argv)
+
+    timings = warm_cache()
+    if timings is None:
+        return
+    for path, (status, elapsed) in timings.items():
+        print(f"{path:<60}{status:>6}{elapsed:>10.1f} ms")
+    print(f"{'total':<60}{'':>6}{sum(elapsed for _, elapsed in timings.values()):>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
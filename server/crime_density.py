@@ -0,0 +1,143 @@
+import logging
+import re
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from dbConnection import SessionLocal
+from aggregation import read_frame
+from mercator import bbox_cell_range, cell_center, cell_index
+from models import CrimeIncident, CrimeDensityCell
+
+logger = logging.getLogger(__name__)
+
+# Grid resolutions precomputed at load time. Resolution r splits the world into
+# 2^r x 2^r Web Mercator cells; at Boston's latitude r=18 cells are about 110m wide.
+MIN_RESOLUTION = 8
+MAX_RESOLUTION = 18
+
+# Cells per tile edge is 2^GRID_OFFSET, i.e. 32px cells on 256px tiles
+GRID_OFFSET = 3
+
+INSERT_BATCH_SIZE = 5000
+
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}')
+
+def resolution_for_zoom(zoom):
+    """Grid resolution used for a map zoom level."""
+    return int(min(max(zoom + GRID_OFFSET, MIN_RESOLUTION), MAX_RESOLUTION))
+
+def parse_month(value):
+    """Reduce a YYYY-MM month or ISO date to its YYYY-MM month."""
+    if not value:
+        return None
+    if not MONTH_PATTERN.match(value):
+        raise ValueError(f"invalid month '{value}', expected YYYY-MM or YYYY-MM-DD")
+    return value[:7]
+
+def compute_crime_density(db: Session, resolutions=None):
+    """
+    Bin every geocoded incident into cells at each resolution, counted per
+    offense code and month. Returns a DataFrame with the CrimeDensityCell columns.
+    """
+    resolutions = resolutions or range(MIN_RESOLUTION, MAX_RESOLUTION + 1)
+    crimes = read_frame(
+        db,
+        select(CrimeIncident.longitude, CrimeIncident.latitude,
+               CrimeIncident.offense_code, CrimeIncident.date)
+        .where(CrimeIncident.latitude.isnot(None), CrimeIncident.longitude.isnot(None)),
+        ['longitude', 'latitude', 'offense_code', 'date']
+    )
+    crimes['month'] = pd.to_datetime(crimes['date']).dt.strftime('%Y-%m')
+    crimes = crimes.drop(columns='date')
+
+    frames = []
+    for resolution in resolutions:
+        cell_x, cell_y = cell_index(crimes['longitude'], crimes['latitude'], resolution)
+        counts = (
+            crimes.assign(cell_x=cell_x, cell_y=cell_y)
+            .groupby(['cell_x', 'cell_y', 'offense_code', 'month'], dropna=False)
+            .size()
+            .rename('count')
+            .reset_index()
+        )
+        counts.insert(0, 'resolution', resolution)
+        frames.append(counts)
+
+    columns = ['resolution', 'cell_x', 'cell_y', 'offense_code', 'month', 'count']
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+def refresh_crime_density(db: Session):
+    """Recompute and replace the precomputed crime_density grid."""
+    try:
+        cells = compute_crime_density(db)
+        table = CrimeDensityCell.__table__
+        db.execute(table.delete())
+        records = cells.astype(object).where(cells.notna(), None).to_dict('records')
+        for start in range(0, len(records), INSERT_BATCH_SIZE):
+            db.execute(table.insert(), records[start:start + INSERT_BATCH_SIZE])
+        db.commit()
+        logger.info(f"Crime density refreshed with {len(records)} cells")
+    except Exception as e:
+        logger.error(f"Error refreshing crime density: {e}")
+        db.rollback()
+
+def _filter_frame(cells, offense_codes=None, start_month=None, end_month=None, cell_range=None):
+    """Apply the density filters to a computed frame (fallback path)."""
+    mask = np.ones(len(cells), dtype=bool)
+    if offense_codes:
+        mask &= cells['offense_code'].isin(offense_codes).to_numpy()
+    if start_month:
+        mask &= (cells['month'] >= start_month).fillna(False).to_numpy(dtype=bool)
+    if end_month:
+        mask &= (cells['month'] <= end_month).fillna(False).to_numpy(dtype=bool)
+    if cell_range:
+        min_x, min_y, max_x, max_y = cell_range
+        mask &= cells['cell_x'].between(min_x, max_x).to_numpy() & cells['cell_y'].between(min_y, max_y).to_numpy()
+    return cells[mask].groupby(['cell_x', 'cell_y'])['count'].sum().reset_index()
+
+def density_cells(db: Session, resolution, offense_codes=None, start_month=None, end_month=None, bbox=None):
+    """
+    Non-empty cells at a resolution with their incident counts, optionally
+    restricted to offense codes, an inclusive month range and a bbox. Reads the
+    precomputed grid, falling back to binning the incidents when it is empty.
+    """
+    cell_range = bbox_cell_range(bbox, resolution) if bbox else None
+    populated = db.execute(select(CrimeDensityCell.id).limit(1)).first() is not None
+
+    if populated:
+        query = select(
+            CrimeDensityCell.cell_x, CrimeDensityCell.cell_y, func.sum(CrimeDensityCell.count)
+        ).where(CrimeDensityCell.resolution == resolution)
+        if offense_codes:
+            query = query.where(CrimeDensityCell.offense_code.in_(offense_codes))
+        if start_month:
+            query = query.where(CrimeDensityCell.month >= start_month)
+        if end_month:
+            query = query.where(CrimeDensityCell.month <= end_month)
+        if cell_range:
+            min_x, min_y, max_x, max_y = cell_range
+            query = query.where(
+                CrimeDensityCell.cell_x.between(min_x, max_x),
+                CrimeDensityCell.cell_y.between(min_y, max_y)
+            )
+        query = query.group_by(CrimeDensityCell.cell_x, CrimeDensityCell.cell_y)
+        cells = read_frame(db, query, ['cell_x', 'cell_y', 'count'])
+    else:
+        logger.warning("crime_density is empty; binning incidents on the fly")
+        cells = _filter_frame(
+            compute_crime_density(db, [resolution]), offense_codes, start_month, end_month, cell_range
+        )
+
+    lon, lat = cell_center(cells['cell_x'].to_numpy(), cells['cell_y'].to_numpy(), resolution)
+    return [
+        {'x': int(x), 'y': int(y), 'lat': float(la), 'lon': float(lo), 'count': int(count)}
+        for x, y, la, lo, count in zip(cells['cell_x'], cells['cell_y'], lat, lon, cells['count'])
+    ]
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        refresh_crime_density(session)
+    finally:
+        session.close()
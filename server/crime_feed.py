@@ -0,0 +1,152 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models import CrimeIncident
+from db_backend import bbox_filter, postgis_enabled
+
+logger = logging.getLogger(__name__)
+
+# Output field name -> (column, serializer) for /api/crime-data
+CRIME_FIELDS = {
+    'id': (CrimeIncident.id, int),
+    'latitude': (CrimeIncident.latitude, float),
+    'longitude': (CrimeIncident.longitude, float),
+    'type': (CrimeIncident.offense_code, None),
+    'description': (CrimeIncident.offense_description, None),
+    'neighborhood': (CrimeIncident.neighborhood, None),
+    'date': (CrimeIncident.date, lambda value: value.isoformat()),
+}
+
+# Fields returned when no projection is requested
+DEFAULT_CRIME_FIELDS = ['latitude', 'longitude', 'type', 'description', 'neighborhood']
+
+MAX_PAGE_SIZE = 10000
+
+# Rows fetched from the database per streamed chunk
+STREAM_BATCH_SIZE = 5000
+
+def parse_fields(value):
+    """Parse a comma-separated fields= projection."""
+    if not value:
+        return DEFAULT_CRIME_FIELDS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in CRIME_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"fields must be a subset of {', '.join(CRIME_FIELDS)}")
+    return fields
+
+def parse_bbox(value):
+    """Parse bbox=min_lon,min_lat,max_lon,max_lat."""
+    if not value:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox minimums must not exceed its maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+def parse_date(value, end=False):
+    """
+    Parse an ISO date or datetime. A bare end date covers that whole day, so the
+    returned bound is exclusive for end dates and inclusive for start dates.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid date '{value}', expected YYYY-MM-DD or an ISO datetime")
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def parse_limit(value):
+    """Parse the page size; None means the whole result set is streamed."""
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+def parse_cursor(value):
+    """Parse the after= cursor, the id of the last incident already returned."""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("after must be a cursor returned as next_cursor")
+
+def crime_query(fields, bbox=None, start=None, end=None, after=None, limit=None, spatial=False):
+    """
+    Build the keyset-paginated incident query. Rows always carry the id first
+    so the caller can emit the next cursor; the projected fields follow.
+    With spatial set the bbox is matched against the PostGIS geometry column.
+    """
+    columns = [CrimeIncident.id] + [CRIME_FIELDS[field][0] for field in fields]
+    query = select(*columns).where(
+        CrimeIncident.latitude.isnot(None),
+        CrimeIncident.longitude.isnot(None)
+    )
+    if bbox:
+        query = query.where(bbox_filter(CrimeIncident, bbox, spatial))
+    if start:
+        query = query.where(CrimeIncident.date >= start)
+    if end:
+        query = query.where(CrimeIncident.date < end)
+    if after is not None:
+        query = query.where(CrimeIncident.id > after)
+    query = query.order_by(CrimeIncident.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def row_serializer(fields):
+    """Return a function turning a crime_query row into an output dict."""
+    converters = [(field, CRIME_FIELDS[field][1]) for field in fields]
+
+    def serialize(row):
+        return {
+            field: value if value is None or convert is None else convert(value)
+            for (field, convert), value in zip(converters, row[1:])
+        }
+    return serialize
+
+def fetch_page(db, fields, limit, **filters):
+    """Fetch one page of incidents; returns (records, next_cursor)."""
+    rows = db.execute(crime_query(fields, limit=limit + 1, spatial=postgis_enabled(db.get_bind()), **filters)).all()
+    next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+    serialize = row_serializer(fields)
+    return [serialize(row) for row in rows[:limit]], next_cursor
+
+def iter_chunks(db, fields, **filters):
+    """Stream every matching incident as lists of output dicts."""
+    serialize = row_serializer(fields)
+    result = db.execute(crime_query(fields, spatial=postgis_enabled(db.get_bind()), **filters).execution_options(stream_results=True))
+    for rows in result.partitions(STREAM_BATCH_SIZE):
+        yield [serialize(row) for row in rows]
+
+def stream_json_array(chunks):
+    """Encode chunks of records as one JSON array without building it in memory."""
+    yield '['
+    first = True
+    for records in chunks:
+        if not records:
+            continue
+        body = json.dumps(records, separators=(',', ':'), sort_keys=True)[1:-1]
+        yield body if first else ',' + body
+        first = False
+    yield ']\n'
+
+def stream_ndjson(chunks):
+    """Encode chunks of records as newline-delimited JSON."""
+    for records in chunks:
+        if records:
+            yield ''.join(json.dumps(record, separators=(',', ':'), sort_keys=True) + '\n' for record in records)
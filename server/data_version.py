@@ -0,0 +1,124 @@
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from dbConnection import ReadSessionLocal
+from models import DataVersion
+
+logger = logging.getLogger(__name__)
+
+def get_data_version(db: Session):
+    """Return the current data generation, or 0 if the loaders never bumped it."""
+    return get_data_stamp(db)[0]
+
+def get_data_stamp(db: Session):
+    """
+    Return (generation, updated_at, epoch) of the current data; (0, None, None)
+    before the first bump.
+    """
+    row = db.execute(
+        select(DataVersion.generation, DataVersion.updated_at, DataVersion.epoch).where(DataVersion.id == 1)
+    ).first()
+    return (row.generation, row.updated_at, row.epoch) if row else (0, None, None)
+
+def data_version_key(generation, epoch):
+    """
+    Identifier of a data version for caches that outlive the database (shared
+    cache keys, ETags, tile directories). The generation restarts at 1 when
+    the database is recreated; the epoch does not repeat.
+    """
+    return f"{epoch}.{generation}" if epoch else str(generation)
+
+def get_data_version_key(db: Session):
+    generation, _, epoch = get_data_stamp(db)
+    return data_version_key(generation, epoch)
+
+def is_older_version(key, than):
+    """Whether version key precedes than in the same database."""
+    epoch, _, generation = str(key).rpartition('.')
+    than_epoch, _, than_generation = str(than).rpartition('.')
+    try:
+        return epoch == than_epoch and int(generation) < int(than_generation)
+    except ValueError:
+        return False
+
+def _version_row(db: Session):
+    """The version row, created with a new epoch if the database has none yet."""
+    row = db.get(DataVersion, 1)
+    if row is None:
+        row = DataVersion(id=1, generation=0)
+        db.add(row)
+    if row.epoch is None:
+        row.epoch = secrets.token_hex(4)
+    return row
+
+def next_data_version_key(db: Session):
+    """
+    Key the next bump_data_version call assigns, for artifacts published just
+    before it. Commits the epoch first if the database has none yet.
+    """
+    row = _version_row(db)
+    if row in db.new or row in db.dirty:
+        db.commit()
+    return data_version_key(row.generation + 1, row.epoch)
+
+def bump_data_version(db: Session):
+    """Increment the data generation after the loaders changed any table."""
+    try:
+        row = _version_row(db)
+        row.generation += 1
+        row.updated_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"Data version bumped to {row.generation}")
+        return row.generation
+    except Exception as e:
+        logger.error(f"Error bumping data version: {e}")
+        db.rollback()
+        return None
+
+class VersionTracker:
+    """
+    Throttled view of the data version for in-process caches: the version is
+    re-read from the database at most once every check_interval seconds.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self._version = None
+        self.updated_at = None
+        self.epoch = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def current(self, db: Session):
+        """Return the data version, refreshing it when the interval has elapsed."""
+        with self._lock:
+            if self._version is None or time.monotonic() - self._checked_at >= self.check_interval:
+                self._version, self.updated_at, self.epoch = get_data_stamp(db)
+                self._checked_at = time.monotonic()
+            return self._version
+
+    def current_key(self, db: Session):
+        """Return the data version key (see data_version_key), refreshing it like current()."""
+        with self._lock:
+            version = self.current(db)
+            return data_version_key(version, self.epoch)
+
+    @property
+    def current_version_key(self):
+        """Last version key read, without touching the database."""
+        return data_version_key(self._version, self.epoch) if self._version is not None else None
+
+# Process-wide tracker shared by the HTTP layers (ETags, cache keys)
+data_versions = VersionTracker()
+
+def current_data_version():
+    """Data version key of the loaded tables, re-read from the database at most every few seconds."""
+    db = ReadSessionLocal()
+    try:
+        return data_versions.current_key(db)
+    finally:
+        db.close()
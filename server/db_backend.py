@@ -0,0 +1,134 @@
+import io
+import logging
+from sqlalchemy import String, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from models import CrimeIncident, School, MBTAStop, RestaurantInspection
+
+logger = logging.getLogger(__name__)
+
+# Point tables that get a PostGIS geometry column: model -> (lon column, lat column)
+POINT_TABLES = {
+    CrimeIncident: (CrimeIncident.longitude, CrimeIncident.latitude),
+    School: (School.longitude, School.latitude),
+    MBTAStop: (MBTAStop.stop_lon, MBTAStop.stop_lat),
+    RestaurantInspection: (RestaurantInspection.longitude, RestaurantInspection.latitude),
+}
+GEOMETRY_COLUMN = 'geom'
+SRID = 4326
+
+class month_bucket(FunctionElement):
+    """
+    Truncate a timestamp to its month as a 'YYYY-MM' string, compiled to the
+    date function of whichever database the query runs on.
+    """
+    type = String()
+    name = 'month_bucket'
+    inherit_cache = True
+
+@compiles(month_bucket)
+def _month_bucket_default(element, compiler, **kw):
+    return f"strftime('%Y-%m', {compiler.process(element.clauses, **kw)})"
+
+@compiles(month_bucket, 'postgresql')
+def _month_bucket_postgresql(element, compiler, **kw):
+    return f"to_char({compiler.process(element.clauses, **kw)}, 'YYYY-MM')"
+
+@compiles(month_bucket, 'mysql')
+def _month_bucket_mysql(element, compiler, **kw):
+    return f"date_format({compiler.process(element.clauses, **kw)}, '%%Y-%%m')"
+
+# Engine URL -> whether PostGIS is installed, so it is only checked once per process
+_postgis_enabled = {}
+
+def postgis_enabled(bind):
+    """Whether bind (an engine or connection) is a PostgreSQL database with PostGIS installed."""
+    if bind.dialect.name != 'postgresql':
+        return False
+    url = str(bind.engine.url)
+    if url not in _postgis_enabled:
+        with bind.engine.connect() as conn:
+            _postgis_enabled[url] = conn.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+            ).scalar() is not None
+    return _postgis_enabled[url]
+
+def apply_spatial_schema(bind):
+    """
+    On PostGIS, give every point table a geometry column generated from its
+    longitude/latitude and a GiST index on it. Generated columns stay in sync
+    with the loaders' plain inserts, so the models do not need to know about
+    them. Returns the names of the created indexes.
+    """
+    if not postgis_enabled(bind):
+        return []
+    created = []
+    with bind.begin() as conn:
+        for model, (lon, lat) in POINT_TABLES.items():
+            table = model.__tablename__
+            index = f'ix_{table}_{GEOMETRY_COLUMN}'
+            conn.execute(text(
+                f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {GEOMETRY_COLUMN} geometry(Point, {SRID}) '
+                f'GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint({lon.name}, {lat.name}), {SRID})) STORED'
+            ))
+            exists = conn.execute(text('SELECT to_regclass(:index)'), {'index': index}).scalar()
+            if exists is None:
+                logger.info(f"Creating GiST index {index} on {table}")
+                conn.execute(text(f'CREATE INDEX {index} ON {table} USING GIST ({GEOMETRY_COLUMN})'))
+                created.append(index)
+    return created
+
+def bbox_filter(model, bbox, spatial=False):
+    """
+    Clause keeping the rows of a point table inside bbox (min_lon, min_lat,
+    max_lon, max_lat). With spatial set the GiST-indexed geometry column is
+    used; otherwise plain longitude/latitude ranges.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lon, lat = POINT_TABLES[model]
+    if spatial:
+        return text(
+            f'{model.__tablename__}.{GEOMETRY_COLUMN} && '
+            f'ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, {SRID})'
+        ).bindparams(min_lon=min_lon, min_lat=min_lat, max_lon=max_lon, max_lat=max_lat)
+    return lon.between(min_lon, max_lon) & lat.between(min_lat, max_lat)
+
+def _csv_field(value):
+    """
+    Format a value for COPY's CSV format. Strings are always quoted, so an
+    unquoted empty field can only mean NULL.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+def _copy_records(db, table, records):
+    """Stream records into a PostgreSQL table with COPY ... FROM STDIN."""
+    columns = list(records[0])
+    buffer = io.StringIO()
+    for record in records:
+        buffer.write(','.join(_csv_field(record[column]) for column in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+    finally:
+        cursor.close()
+
+def insert_records(db, table, records):
+    """
+    Insert a batch of record dicts into a Core table in the session's
+    transaction: COPY on PostgreSQL, an executemany insert elsewhere.
+    """
+    if not records:
+        return
+    if db.get_bind().dialect.name == 'postgresql':
+        _copy_records(db, table, records)
+    else:
+        db.execute(table.insert(), records)
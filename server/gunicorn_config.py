@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+
+def build_config(env=None):
+    """
+    Gunicorn settings from the environment. Sizing defaults to (2 x CPUs) + 1
+    threaded workers; SQLite reads release the GIL, so threads add throughput
+    without extra copies of the in-memory stores.
+    """
+    env = os.environ if env is None else env
+    cpus = multiprocessing.cpu_count()
+    return {
+        'bind': env.get('BIND', f"0.0.0.0:{env.get('PORT', '5001')}"),
+        'workers': int(env.get('WEB_CONCURRENCY', cpus * 2 + 1)),
+        'threads': int(env.get('GUNICORN_THREADS', 4)),
+        'worker_class': env.get('GUNICORN_WORKER_CLASS', 'gthread'),
+        # Import the app once in the master so workers share its memory pages
+        'preload_app': env.get('GUNICORN_PRELOAD', '1') != '0',
+        'timeout': int(env.get('GUNICORN_TIMEOUT', 60)),
+        'graceful_timeout': int(env.get('GUNICORN_GRACEFUL_TIMEOUT', 30)),
+        'keepalive': int(env.get('GUNICORN_KEEPALIVE', 5)),
+        # Recycle workers periodically to bound memory growth
+        'max_requests': int(env.get('GUNICORN_MAX_REQUESTS', 5000)),
+        'max_requests_jitter': int(env.get('GUNICORN_MAX_REQUESTS_JITTER', 500)),
+        # Set GUNICORN_ACCESS_LOG to an empty string to disable the access log
+        'accesslog': env.get('GUNICORN_ACCESS_LOG', '-') or None,
+        'errorlog': env.get('GUNICORN_ERROR_LOG', '-'),
+        'loglevel': env.get('LOG_LEVEL', 'info').lower(),
+    }
+
+globals().update(build_config())
+
+def on_starting(server):
+    """
+    Create tables and apply migrations once, before any worker starts. With
+    preload_app the master already did so while importing the app; either way
+    workers (including those recycled by max_requests) skip it.
+    """
+    if not server.cfg.preload_app:
+        from dbConnection import init_db
+        init_db()
+    os.environ['INIT_DB'] = '0'
+
+def post_fork(server, worker):
+    """Give each worker its own database connections and cache warmer thread."""
+    from dbConnection import engine, read_engine
+    from app import app
+    from cache_warmer import start_background_warmer
+    # Connections opened in the master must not be shared across processes
+    engine.dispose()
+    read_engine.dispose()
+    start_background_warmer(app)
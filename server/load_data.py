@@ -1,17 +1,35 @@
 import pandas as pd
-import geopandas as gpd
+import numpy as np
+from sqlalchemy import Integer, Float, DateTime, bindparam, select
 from sqlalchemy.orm import Session
 from dbConnection import SessionLocal, init_db
+from neighborhood_stats import refresh_neighborhood_stats
+from crime_density import refresh_crime_density
+from boundaries import refresh_boundaries
+from arrow_snapshot import refresh_snapshot
+from data_version import bump_data_version, next_data_version_key
+from db_backend import insert_records
 from models.neighborhood import NeighborhoodDemographics
 from models.property import PropertyAssessment
 from models.crime import CrimeIncident
 from models.school import School
 from models.mbta import MBTAStop
 from models.restaurant import RestaurantInspection
+import argparse
+import itertools
 import logging
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
 from pathlib import Path
 
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,17 +39,25 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
 DATA_PROCESSED_DIR = Path(os.path.join(PROJECT_ROOT, "data", "processed"))
 
-def inspect_csv(file_path):
-    """Inspect CSV file columns."""
+# Number of rows sent to the database per executemany call (and per commit)
+DEFAULT_BATCH_SIZE = 5000
+
+# Number of rows read, cleaned and inserted at a time
+DEFAULT_CHUNK_SIZE = 50000
+
+def inspect_columns(file_path):
+    """Inspect the columns of a CSV or Parquet file."""
     try:
-        df = pd.read_csv(file_path, nrows=0)
-        columns = df.columns.tolist()
+        if Path(file_path).suffix == '.parquet':
+            columns = pq.read_schema(file_path).names
+        else:
+            columns = pd.read_csv(file_path, nrows=0).columns.tolist()
         logger.info(f"Columns in {file_path}:")
         for col in columns:
             logger.info(f"  - {col}")
         return columns
     except Exception as e:
-        logger.error(f"Error inspecting CSV file {file_path}: {e}")
+        logger.error(f"Error inspecting file {file_path}: {e}")
         return None
 
 def clean_currency(value):
@@ -50,279 +76,549 @@ def clean_percentage(value):
         return float(value.replace('%', '')) / 100
     return float(value)
 
-def load_neighborhood_demographics(db: Session):
-    """Load neighborhood demographics data."""
+def prepare_frame(model, df):
+    """
+    Select the columns of df that belong to the model's table and coerce them
+    to the column types, so every row can be sent to the database as-is.
+    """
+    prepared = {}
+    for column in model.__table__.columns:
+        if column.primary_key or column.name not in df.columns:
+            continue
+        series = df[column.name]
+        if isinstance(column.type, Integer):
+            series = np.trunc(pd.to_numeric(series, errors='coerce')).astype('Int64')
+        elif isinstance(column.type, Float):
+            series = pd.to_numeric(series, errors='coerce').astype(float)
+        elif isinstance(column.type, DateTime):
+            series = pd.to_datetime(series, errors='coerce')
+        else:
+            series = series.where(series.isna(), series.astype(str))
+        prepared[column.name] = series
+    return pd.DataFrame(prepared, index=df.index)
+
+def frame_to_records(frame):
+    """Convert a prepared DataFrame to a list of dicts with None for missing values."""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def read_csv_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    """
+    Yield a CSV file as DataFrames of at most chunk_size rows so only one chunk
+    is held in memory at a time. A falsy chunk_size reads the whole file at once.
+    """
+    if not chunk_size:
+        yield pd.read_csv(file_path, **kwargs)
+        return
+    with pd.read_csv(file_path, chunksize=chunk_size, **kwargs) as reader:
+        for chunk in reader:
+            yield chunk
+
+def read_parquet_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    """
+    Yield a Parquet file as DataFrames of at most chunk_size rows, decoding one
+    record batch at a time. A falsy chunk_size reads the whole file at once.
+    """
+    if not chunk_size:
+        yield pq.read_table(file_path, columns=columns).to_pandas()
+        return
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
+
+def read_dataset_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE, read_options=None):
+    """
+    Yield a processed file as DataFrame chunks. Parquet files are already
+    typed; of the pandas.read_csv options only usecols applies to them.
+    """
+    read_options = read_options or {}
+    if Path(file_path).suffix == '.parquet':
+        return read_parquet_chunks(file_path, chunk_size, read_options.get('usecols'))
+    return read_csv_chunks(file_path, chunk_size, **read_options)
+
+def iter_record_batches(model, chunks, batch_size=DEFAULT_BATCH_SIZE, key=None):
+    """
+    Yield lists of at most batch_size insert-ready records from DataFrame
+    chunks. Each chunk is released before the next one is read. With a
+    natural key only the first row of each key is kept, as the table's
+    unique index requires.
+    """
+    seen = set()
+    for chunk in chunks:
+        frame = prepare_frame(model, chunk)
+        if key is not None:
+            first = []
+            for row_key in row_keys(frame, key):
+                first.append(row_key not in seen)
+                seen.add(row_key)
+            frame = frame[first]
+        for offset in range(0, len(frame), batch_size):
+            yield frame_to_records(frame.iloc[offset:offset + batch_size])
+        del chunk, frame
+
+def log_insert_rate(table_name, total_rows, elapsed):
+    """Log the number of rows inserted into a table and the rows/sec achieved."""
+    rate = total_rows / elapsed if elapsed > 0 else float(total_rows)
+    logger.info(f"Inserted {total_rows} rows into {table_name} in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+def bulk_insert(db: Session, model, chunks, batch_size=DEFAULT_BATCH_SIZE, key=None, commit=True):
+    """
+    Insert DataFrame chunks into the model's table in batches (executemany,
+    or COPY on PostgreSQL), committing after each batch unless commit is
+    False, in which case the caller commits. Accepts a single DataFrame or any
+    iterable of DataFrames. Returns the number of rows inserted.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    table = model.__table__
+    total_rows = 0
+    start = time.perf_counter()
+
+    for records in iter_record_batches(model, chunks, batch_size, key):
+        insert_records(db, table, records)
+        if commit:
+            db.commit()
+        total_rows += len(records)
+
+    log_insert_rate(table.name, total_rows, time.perf_counter() - start)
+    return total_rows
+
+def clean_neighborhood_demographics(df):
+    """Clean raw neighborhood demographics columns."""
+    # Clean population by removing commas
+    df['population'] = df['population'].astype(str).str.replace(',', '').astype(int)
+
+    # Clean percentage columns
+    percentage_columns = [
+        'age_0_9_years', 'age_10_19_years', 'age_20_34_years', 'age_35_54_years',
+        'age_55_64_years', 'age_65_years_and_over', 'less_than_high_school',
+        'high_school_or_ged', 'some_college_or_associate_degree',
+        'bachelor_degree_or_higher', 'white', 'black_or_african_american',
+        'hispanic', 'asian_or_pi', 'other'
+    ]
+
+    for col in percentage_columns:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace('%', '').astype(float) / 100
+
+    # Clean currency columns
+    currency_columns = ['per_capita_income', 'median_family_income']
+    for col in currency_columns:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace('$', '').str.replace(',', '').astype(float)
+
+    return df
+
+def clean_property_assessment(df):
+    """Clean raw property assessment columns."""
+    # Clean numeric columns by removing commas, dollar signs, and empty spaces
+    numeric_columns = ['land_sf', 'gross_area', 'living_area', 'land_value',
+                     'bldg_value', 'total_value', 'gross_tax']
+
+    for col in numeric_columns:
+        if col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].str.replace(r'[\$,\s]', '', regex=True)
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    # Room and amenity counts default to zero when missing
+    count_columns = ['bed_rms', 'full_bth', 'hlf_bth', 'kitchens', 'fireplaces', 'num_parking']
+    for col in count_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    return df
+
+def clean_crime_incidents(df):
+    """Clean raw crime incident columns."""
+    df['crime_rate'] = pd.to_numeric(df['crime_rate'], errors='coerce').fillna(0)
+    return df
+
+def clean_restaurant_inspections(df):
+    """Clean raw restaurant inspection columns."""
+    return df.rename(columns={'businessname': 'business_name'})
+
+# Processed datasets loaded into the database, in load order. Each entry names
+# the CSV under data/processed (a Parquet file of the same name is preferred),
+# the target model, an optional per-chunk cleaning function, extra
+# pandas.read_csv options and the natural key used by incremental syncs (None
+# means the table is replaced wholesale).
+DATASETS = {
+    'neighborhood_demographics': {
+        'label': 'Neighborhood demographics',
+        'file_name': 'neighborhood_demographics.csv',
+        'model': NeighborhoodDemographics,
+        'clean': clean_neighborhood_demographics,
+        'read_options': {},
+        'key': None,
+    },
+    'property_assessment': {
+        'label': 'Property assessment',
+        'file_name': 'property-assessment-fy2025_clean.csv',
+        'model': PropertyAssessment,
+        'clean': clean_property_assessment,
+        'read_options': {'low_memory': False},
+        'key': ('pid',),
+    },
+    'crime_incidents': {
+        'label': 'Crime incident',
+        'file_name': 'crime-incident-reports_clean.csv',
+        'model': CrimeIncident,
+        'clean': clean_crime_incidents,
+        'read_options': {},
+        'key': ('incident_number', 'offense_code'),
+    },
+    'schools': {
+        'label': 'School',
+        'file_name': 'schools_clean.csv',
+        'model': School,
+        'clean': None,
+        'read_options': {'usecols': ['neighborhood', 'name', 'longitude', 'latitude']},
+        'key': None,
+    },
+    'mbta_stops': {
+        'label': 'MBTA stops',
+        'file_name': 'mbta_stops_clean.csv',
+        'model': MBTAStop,
+        'clean': None,
+        'read_options': {},
+        'key': ('stop_id',),
+    },
+    'restaurant_inspections': {
+        'label': 'Restaurant inspection',
+        'file_name': 'restaurant-inspections_clean.csv',
+        'model': RestaurantInspection,
+        'clean': clean_restaurant_inspections,
+        'read_options': {},
+        'key': None,
+    },
+}
+
+def dataset_path(name):
+    """
+    Processed file of a registered dataset: the typed Parquet file written by
+    the preprocessing pipeline when present (and pyarrow is installed),
+    otherwise the CSV.
+    """
+    csv_path = DATA_PROCESSED_DIR / DATASETS[name]['file_name']
+    parquet_path = csv_path.with_suffix('.parquet')
+    if pq is not None and parquet_path.exists():
+        return parquet_path
+    return csv_path
+
+def iter_dataset_chunks(name, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield cleaned DataFrame chunks of a registered dataset."""
+    dataset = DATASETS[name]
+    chunks = read_dataset_chunks(dataset_path(name), chunk_size, dataset['read_options'])
+    if dataset['clean'] is None:
+        return chunks
+    return map(dataset['clean'], chunks)
+
+def load_dataset(db: Session, name, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Load one registered dataset into its table."""
+    dataset = DATASETS[name]
     try:
-        file_path = DATA_PROCESSED_DIR / 'neighborhood_demographics.csv'
+        file_path = dataset_path(name)
         logger.info(f"Loading data from: {file_path}")
-        
-        # Inspect the CSV file first
-        columns = inspect_csv(file_path)
+
+        # Inspect the file's columns first
+        columns = inspect_columns(file_path)
         if not columns:
             return
-            
-        df = pd.read_csv(file_path)
-        
-        # Clean population by removing commas
-        df['population'] = df['population'].astype(str).str.replace(',', '').astype(int)
-        
-        # Clean percentage columns
-        percentage_columns = [
-            'age_0_9_years', 'age_10_19_years', 'age_20_34_years', 'age_35_54_years',
-            'age_55_64_years', 'age_65_years_and_over', 'less_than_high_school',
-            'high_school_or_ged', 'some_college_or_associate_degree',
-            'bachelor_degree_or_higher', 'white', 'black_or_african_american',
-            'hispanic', 'asian_or_pi', 'other'
-        ]
-        
-        for col in percentage_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace('%', '').astype(float) / 100
-        
-        # Clean currency columns
-        currency_columns = ['per_capita_income', 'median_family_income']
-        for col in currency_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace('$', '').str.replace(',', '').astype(float)
-        
-        for _, row in df.iterrows():
-            demographics = NeighborhoodDemographics(
-                neighborhood=row['neighborhood'],
-                population=row['population'],
-                age_0_9_years=row['age_0_9_years'],
-                age_10_19_years=row['age_10_19_years'],
-                age_20_34_years=row['age_20_34_years'],
-                age_35_54_years=row['age_35_54_years'],
-                age_55_64_years=row['age_55_64_years'],
-                age_65_years_and_over=row['age_65_years_and_over'],
-                less_than_high_school=row['less_than_high_school'],
-                high_school_or_ged=row['high_school_or_ged'],
-                some_college_or_associate_degree=row['some_college_or_associate_degree'],
-                bachelor_degree_or_higher=row['bachelor_degree_or_higher'],
-                white=row['white'],
-                black_or_african_american=row['black_or_african_american'],
-                hispanic=row['hispanic'],
-                asian_or_pi=row['asian_or_pi'],
-                other=row['other'],
-                per_capita_income=row['per_capita_income'],
-                median_family_income=row['median_family_income']
-            )
-            db.add(demographics)
-        
-        db.commit()
-        logger.info("Neighborhood demographics data loaded successfully")
+
+        bulk_insert(db, dataset['model'], iter_dataset_chunks(name, chunk_size), batch_size, dataset['key'])
+        logger.info(f"{dataset['label']} data loaded successfully")
     except Exception as e:
-        logger.error(f"Error loading neighborhood demographics data: {e}")
+        logger.error(f"Error loading {dataset['label'].lower()} data: {e}")
         db.rollback()
 
-def load_property_assessment(db: Session):
+def load_neighborhood_demographics(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Load neighborhood demographics data."""
+    load_dataset(db, 'neighborhood_demographics', batch_size, chunk_size)
+
+def load_property_assessment(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
     """Load property assessment data."""
-    try:
-        file_path = DATA_PROCESSED_DIR / 'property-assessment-fy2025_clean.csv'
-        logger.info(f"Loading data from: {file_path}")
-        
-        # Inspect the CSV file first
-        columns = inspect_csv(file_path)
-        if not columns:
-            return
-            
-        df = pd.read_csv(file_path, low_memory=False)
-        
-        # Clean numeric columns by removing commas, dollar signs, and empty spaces
-        numeric_columns = ['land_sf', 'gross_area', 'living_area', 'land_value', 
-                         'bldg_value', 'total_value', 'gross_tax']
-        
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace('$', '').str.replace(',', '').str.strip()
-                df[col] = df[col].replace('', '0').replace('nan', '0').replace('NA', '0')
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        for _, row in df.iterrows():
-            property_data = PropertyAssessment(
-                pid=row['pid'],
-                st_name=row['st_name'],
-                city=row['city'],
-                zip_code=row['zip_code'],
-                land_sf=float(row['land_sf']),
-                gross_area=float(row['gross_area']),
-                living_area=float(row['living_area']),
-                land_value=float(row['land_value']),
-                bldg_value=float(row['bldg_value']),
-                total_value=float(row['total_value']),
-                gross_tax=float(row['gross_tax']),
-                yr_built=int(row['yr_built']) if pd.notna(row['yr_built']) else None,
-                yr_remodel=int(row['yr_remodel']) if pd.notna(row['yr_remodel']) else None,
-                int_con=row['int_con'],
-                ext_con=row['ext_con'],
-                overall_con=row['overall_con'],
-                bed_rms=int(row['bed_rms']) if pd.notna(row['bed_rms']) else 0,
-                full_bth=int(row['full_bth']) if pd.notna(row['full_bth']) else 0,
-                hlf_bth=int(row['hlf_bth']) if pd.notna(row['hlf_bth']) else 0,
-                kitchens=int(row['kitchens']) if pd.notna(row['kitchens']) else 0,
-                heat_type=row['heat_type'],
-                ac_type=row['ac_type'],
-                fireplaces=int(row['fireplaces']) if pd.notna(row['fireplaces']) else 0,
-                num_parking=int(row['num_parking']) if pd.notna(row['num_parking']) else 0,
-                neighborhood=row['neighborhood']
-            )
-            db.add(property_data)
-        
-        db.commit()
-        logger.info("Property assessment data loaded successfully")
-    except Exception as e:
-        logger.error(f"Error loading property assessment data: {e}")
-        db.rollback()
+    load_dataset(db, 'property_assessment', batch_size, chunk_size)
 
-def load_crime_incidents(db: Session):
+def load_crime_incidents(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
     """Load crime incident data."""
-    try:
-        file_path = DATA_PROCESSED_DIR / 'crime-incident-reports_clean.csv'
-        logger.info(f"Loading data from: {file_path}")
-        
-        # Inspect the CSV file first
-        columns = inspect_csv(file_path)
-        if not columns:
-            return
-            
-        df = pd.read_csv(file_path)
-        
-        for _, row in df.iterrows():
-            crime = CrimeIncident(
-                incident_number=row['incident_number'],
-                offense_code=row['offense_code'],
-                offense_description=row['offense_description'],
-                date=pd.to_datetime(row['date']),
-                day_of_week=row['day_of_week'],
-                hour=int(row['hour']) if pd.notna(row['hour']) else None,
-                street=row['street'],
-                latitude=float(row['latitude']) if pd.notna(row['latitude']) else None,
-                longitude=float(row['longitude']) if pd.notna(row['longitude']) else None,
-                neighborhood=row['neighborhood'],
-                crime_rate=float(row['crime_rate']) if pd.notna(row['crime_rate']) else 0
-            )
-            db.add(crime)
-        
-        db.commit()
-        logger.info("Crime incident data loaded successfully")
-    except Exception as e:
-        logger.error(f"Error loading crime incident data: {e}")
-        db.rollback()
+    load_dataset(db, 'crime_incidents', batch_size, chunk_size)
 
-def load_schools(db: Session):
+def load_schools(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
     """Load school data."""
-    try:
-        file_path = DATA_PROCESSED_DIR / 'schools_clean.csv'
-        logger.info(f"Loading data from: {file_path}")
-        
-        # Inspect the CSV file first
-        columns = inspect_csv(file_path)
-        if not columns:
-            return
-            
-        df = pd.read_csv(file_path)
-        
-        for _, row in df.iterrows():
-            school = School(
-                neighborhood=row['neighborhood'],
-                name=row['name'],
-                longitude=float(row['longitude']) if pd.notna(row['longitude']) else None,
-                latitude=float(row['latitude']) if pd.notna(row['latitude']) else None
-            )
-            db.add(school)
-        
-        db.commit()
-        logger.info("School data loaded successfully")
-    except Exception as e:
-        logger.error(f"Error loading school data: {e}")
-        db.rollback()
+    load_dataset(db, 'schools', batch_size, chunk_size)
 
-def load_mbta_stops(db: Session):
+def load_mbta_stops(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
     """Load MBTA stops data."""
+    load_dataset(db, 'mbta_stops', batch_size, chunk_size)
+
+def load_restaurant_inspections(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Load restaurant inspection data."""
+    load_dataset(db, 'restaurant_inspections', batch_size, chunk_size)
+
+def parse_dataset(name, queue, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Worker process: parse and clean one dataset and put its record batches on
+    the queue as (name, records). A final (name, None) marks the end.
+    """
+    dataset = DATASETS[name]
     try:
-        file_path = DATA_PROCESSED_DIR / 'mbta_stops_clean.csv'
-        logger.info(f"Loading data from: {file_path}")
-        
-        # Inspect the CSV file first
-        columns = inspect_csv(file_path)
-        if not columns:
+        file_path = dataset_path(name)
+        logger.info(f"Parsing data from: {file_path}")
+
+        # Inspect the file's columns first
+        if not inspect_columns(file_path):
             return
-            
-        df = pd.read_csv(file_path)
-        
-        for _, row in df.iterrows():
-            stop = MBTAStop(
-                stop_id=row['stop_id'],
-                stop_name=row['stop_name'],
-                stop_lat=float(row['stop_lat']) if pd.notna(row['stop_lat']) else None,
-                stop_lon=float(row['stop_lon']) if pd.notna(row['stop_lon']) else None,
-                stop_url=row['stop_url'],
-                wheelchair_boarding=row['wheelchair_boarding'],
-                on_street=row['on_street'],
-                at_street=row['at_street'],
-                neighborhood=row['neighborhood']
-            )
-            db.add(stop)
-        
-        db.commit()
-        logger.info("MBTA stops data loaded successfully")
+
+        chunks = iter_dataset_chunks(name, chunk_size)
+        for records in iter_record_batches(dataset['model'], chunks, batch_size, dataset['key']):
+            queue.put((name, records))
     except Exception as e:
-        logger.error(f"Error loading MBTA stops data: {e}")
-        db.rollback()
+        logger.error(f"Error parsing {dataset['label'].lower()} data: {e}")
+    finally:
+        queue.put((name, None))
 
-def load_restaurant_inspections(db: Session):
-    """Load restaurant inspection data."""
+def load_all_parallel(db: Session, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """
+    Load every registered dataset, parsing and cleaning them in a process pool
+    while this process is the single writer that inserts the record batches.
+    """
+    workers = workers or min(len(DATASETS), os.cpu_count() or 1)
+    start = time.perf_counter()
+    with multiprocessing.Manager() as manager:
+        # Bound the queue so fast parsers cannot run far ahead of the writer
+        queue = manager.Queue(maxsize=workers * 2)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(parse_dataset, name, queue, batch_size, chunk_size)
+                for name in DATASETS
+            ]
+            pending = set(DATASETS)
+            row_counts = {name: 0 for name in DATASETS}
+            started = {}
+            while pending:
+                try:
+                    name, records = queue.get(timeout=1)
+                except Empty:
+                    if all(future.done() for future in futures):
+                        logger.error(f"Parser workers exited before finishing: {sorted(pending)}")
+                        break
+                    continue
+
+                dataset = DATASETS[name]
+                if records is None:
+                    pending.discard(name)
+                    elapsed = time.perf_counter() - started.get(name, time.perf_counter())
+                    log_insert_rate(dataset['model'].__tablename__, row_counts[name], elapsed)
+                    continue
+
+                started.setdefault(name, time.perf_counter())
+                try:
+                    insert_records(db, dataset['model'].__table__, records)
+                    db.commit()
+                    row_counts[name] += len(records)
+                except Exception as e:
+                    logger.error(f"Error inserting {dataset['label'].lower()} data: {e}")
+                    db.rollback()
+
+            for future in futures:
+                future.result()
+
+    logger.info(f"Parallel load finished in {time.perf_counter() - start:.2f}s")
+    return row_counts
+
+def iter_table_frames(db: Session, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the rows of a Core select over columns as DataFrames of chunk_size rows."""
+    result = db.execute(select(*columns).execution_options(stream_results=True))
+    names = [column.name for column in columns]
+    for rows in result.partitions(chunk_size or None):
+        yield pd.DataFrame.from_records(rows, columns=names)
+
+def row_hashes(frame, columns):
+    """Hash the given columns of a prepared frame so unchanged rows can be detected."""
+    values = frame[columns].copy()
+    for col in columns:
+        if pd.api.types.is_datetime64_any_dtype(values[col]):
+            values[col] = values[col].astype('datetime64[ns]')
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def row_keys(frame, key):
+    """Return the natural key of every row of a frame as a list of tuples."""
+    return list(zip(*(frame[col].tolist() for col in key)))
+
+def sync_dataset(db: Session, name, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Incrementally sync one registered dataset into its table. Rows are matched
+    on the dataset's natural key: new keys are inserted, rows whose values
+    changed are updated in place and keys missing from the file are deleted.
+    Datasets without a natural key are replaced wholesale. Either way the
+    changes are committed in a single transaction, so readers see the old
+    table until the sync is complete.
+    """
+    dataset = DATASETS[name]
+    model = dataset['model']
+    table = model.__table__
+    key = dataset['key']
     try:
-        file_path = DATA_PROCESSED_DIR / 'restaurant-inspections_clean.csv'
-        logger.info(f"Loading data from: {file_path}")
-        
-        # Inspect the CSV file first
-        columns = inspect_csv(file_path)
+        file_path = dataset_path(name)
+        logger.info(f"Syncing data from: {file_path}")
+
+        # Inspect the file's columns first
+        columns = inspect_columns(file_path)
         if not columns:
             return
-            
-        df = pd.read_csv(file_path)
-        
-        for _, row in df.iterrows():
-            inspection = RestaurantInspection(
-                business_name=row['businessname'],
-                address=row['address'],
-                latitude=float(row['latitude']),
-                longitude=float(row['longitude']),
-                neighborhood=row['neighborhood']
-            )
-            db.add(inspection)
-        
+
+        if key is None:
+            db.execute(table.delete())
+            bulk_insert(db, model, iter_dataset_chunks(name, chunk_size), batch_size, commit=False)
+            db.commit()
+            logger.info(f"{dataset['label']} data replaced")
+            return
+
+        start = time.perf_counter()
+        chunks = iter_dataset_chunks(name, chunk_size)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return
+        chunks = itertools.chain([first_chunk], chunks)
+
+        # Only the columns the file provides take part in change detection
+        value_columns = prepare_frame(model, first_chunk.head(0)).columns.tolist()
+
+        # Index the current table contents as natural key -> (id, row hash)
+        existing = {}
+        stale_ids = []
+        for frame in iter_table_frames(db, list(table.columns), chunk_size):
+            ids = frame['id'].tolist()
+            frame = prepare_frame(model, frame)
+            for row_id, row_key, row_hash in zip(ids, row_keys(frame, key), row_hashes(frame, value_columns)):
+                if row_key in existing:
+                    stale_ids.append(row_id)
+                else:
+                    existing[row_key] = (row_id, row_hash)
+
+        update = table.update().where(table.c.id == bindparam('_id'))
+        seen = set()
+        inserted = updated = 0
+        for chunk in chunks:
+            frame = prepare_frame(model, chunk)
+            frame = frame.drop_duplicates(subset=list(key))
+            keys = row_keys(frame, key)
+            hashes = row_hashes(frame, value_columns)
+            records = frame_to_records(frame)
+
+            new_rows, changed_rows = [], []
+            for row_key, row_hash, record in zip(keys, hashes, records):
+                if row_key in seen:
+                    continue
+                seen.add(row_key)
+                current = existing.get(row_key)
+                if current is None:
+                    new_rows.append(record)
+                elif current[1] != row_hash:
+                    changed_rows.append(dict(record, _id=current[0]))
+
+            for offset in range(0, len(new_rows), batch_size):
+                insert_records(db, table, new_rows[offset:offset + batch_size])
+            for offset in range(0, len(changed_rows), batch_size):
+                db.execute(update, changed_rows[offset:offset + batch_size])
+            inserted += len(new_rows)
+            updated += len(changed_rows)
+            del chunk, frame, records
+
+        deleted_ids = stale_ids + [row_id for row_key, (row_id, _) in existing.items() if row_key not in seen]
+        for offset in range(0, len(deleted_ids), batch_size):
+            db.execute(table.delete().where(table.c.id.in_(deleted_ids[offset:offset + batch_size])))
         db.commit()
-        logger.info("Restaurant inspection data loaded successfully")
+
+        elapsed = time.perf_counter() - start
+        unchanged = len(seen) - inserted - updated
+        logger.info(
+            f"Synced {table.name} in {elapsed:.2f}s: {inserted} inserted, {updated} updated, "
+            f"{len(deleted_ids)} deleted, {unchanged} unchanged"
+        )
     except Exception as e:
-        logger.error(f"Error loading restaurant inspection data: {e}")
+        logger.error(f"Error syncing {dataset['label'].lower()} data: {e}")
         db.rollback()
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options for the data loader."""
+    parser = argparse.ArgumentParser(description="Load processed data into the database.")
+    parser.add_argument(
+        '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+        help=f"Rows per insert batch and commit (default: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+        help=f"CSV rows read and cleaned at a time, 0 to read whole files (default: {DEFAULT_CHUNK_SIZE})"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        '--incremental', action='store_true',
+        help="Sync the existing tables by natural key instead of appending every row"
+    )
+    mode.add_argument(
+        '--parallel', action='store_true',
+        help="Parse datasets in a process pool while a single writer inserts them"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help="Number of parser processes for --parallel (default: one per dataset, up to the CPU count)"
+    )
+    parser.add_argument(
+        '--warm-cache', action='store_true',
+        help="Precompute the cached API payloads for the new data before it is served"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to load all data."""
+    args = parse_args(argv)
     try:
         # Initialize database
         init_db()
-        
+
         # Create session
         db = SessionLocal()
-        
+
         try:
             # Load all data
-            load_neighborhood_demographics(db)
-            load_property_assessment(db)
-            load_crime_incidents(db)
-            load_schools(db)
-            load_mbta_stops(db)
-            load_restaurant_inspections(db)
-            
+            if args.incremental:
+                for name in DATASETS:
+                    sync_dataset(db, name, args.batch_size, args.chunk_size)
+            elif args.parallel:
+                load_all_parallel(db, args.batch_size, args.chunk_size, args.workers)
+            else:
+                for name in DATASETS:
+                    load_dataset(db, name, args.batch_size, args.chunk_size)
+
+            # Rebuild the materialized aggregates from the freshly loaded tables
+            refresh_neighborhood_stats(db)
+            refresh_crime_density(db)
+
+            # Publish the columnar snapshot and the boundaries artifact under the
+            # version the bump below assigns, so API workers use them as soon as
+            # they notice the bump
+            next_version = next_data_version_key(db)
+            refresh_snapshot(db, next_version)
+            refresh_boundaries(db, next_version)
+
+            if args.warm_cache:
+                # Import the API before bumping so the warm-up starts right after it
+                from cache_warmer import warm_cache
+                from app import app
+
+            # Signal API workers that their in-memory data is stale
+            version = bump_data_version(db)
+
+            if args.warm_cache and version is not None:
+                warm_cache(app)
+
             logger.info("All data loaded successfully")
         finally:
             db.close()
-            
+
     except Exception as e:
         logger.error(f"Error in main data loading: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
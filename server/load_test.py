@@ -0,0 +1,124 @@
+import argparse
+import http.client
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATHS = [
+    '/api/neighborhoods',
+    '/api/affordability',
+    '/api/neighborhood-summary/Allston',
+    '/api/visualizations/neighborhood-comparison',
+    '/api/search?minPrice=500000',
+    '/api/crime-density?zoom=13',
+]
+
+# Commands that start each server mode on a port
+SERVERS = {
+    'dev': lambda port: [sys.executable, 'app.py'],
+    'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py', 'wsgi:app'],
+}
+
+def start_server(mode, port):
+    """Start a server in the background and wait until it answers /api/health."""
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG='0', LOG_LEVEL='WARNING',
+               GUNICORN_ACCESS_LOG='', CACHE_WARM_INTERVAL='0')
+    process = subprocess.Popen(SERVERS[mode](port), cwd=BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+def run_load(base_url, paths, concurrency, duration):
+    """
+    Hammer the server from concurrency keep-alive clients for duration seconds.
+    Returns (requests, errors, latencies in ms).
+    """
+    url = urlsplit(base_url)
+    deadline = time.time() + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client(offset):
+        conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+        local, failed, i = [], 0, offset
+        while time.time() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), errors[0], latencies
+
+def report(label, requests, errors, latencies, duration):
+    latencies = sorted(latencies) or [0]
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(f"{label:<12}{requests / duration:>10.1f}{statistics.median(latencies):>10.1f}{p95:>10.1f}{errors:>8}")
+
+def main(argv=None):
+    """Compare requests/sec of the Flask dev server and gunicorn under concurrent load."""
+    parser = argparse.ArgumentParser(description="Load test the API under the dev server and gunicorn.")
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS),
+                        help="Server modes to start and test (default: all)")
+    parser.add_argument('--url', default=None, help="Test an already running server instead of starting one")
+    parser.add_argument('--port', type=int, default=5101, help="Port for the servers started by the harness")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds of load per server (default: 10)")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help="Paths requested round-robin")
+    args = parser.parse_args(argv)
+
+    print(f"{'server':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    if args.url:
+        report('external', *run_load(args.url, args.paths, args.concurrency, args.duration), args.duration)
+        return
+
+    for mode in args.servers:
+        process = start_server(mode, args.port)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            # One pass to fill the caches so both modes are measured warm
+            run_load(base_url, args.paths, 1, 1)
+            report(mode, *run_load(base_url, args.paths, args.concurrency, args.duration), args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import math
+import numpy as np
+
+# Web Mercator is undefined at the poles; clamp latitudes like map clients do
+MAX_LATITUDE = 85.0511287798
+
+def lonlat_to_world(lon, lat):
+    """
+    Project longitudes/latitudes (scalars or arrays) to Web Mercator world
+    coordinates in [0, 1), with y growing southwards like tile rows.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+    return x, y
+
+def world_to_lonlat(x, y):
+    """Inverse of lonlat_to_world."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    lon = x * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * y))))
+    return lon, lat
+
+def cell_index(lon, lat, resolution):
+    """Column and row of the cells containing each point at a grid resolution."""
+    x, y = lonlat_to_world(lon, lat)
+    size = 1 << resolution
+    cell_x = np.clip(np.floor(x * size), 0, size - 1).astype(np.int64)
+    cell_y = np.clip(np.floor(y * size), 0, size - 1).astype(np.int64)
+    return cell_x, cell_y
+
+def cell_center(cell_x, cell_y, resolution):
+    """Longitude and latitude of the cell centers."""
+    size = 1 << resolution
+    return world_to_lonlat((np.asarray(cell_x) + 0.5) / size, (np.asarray(cell_y) + 0.5) / size)
+
+def cell_bounds(cell_x, cell_y, resolution):
+    """Bounding box (min_lon, min_lat, max_lon, max_lat) of a single cell or tile."""
+    size = 1 << resolution
+    min_lon, max_lat = world_to_lonlat(cell_x / size, cell_y / size)
+    max_lon, min_lat = world_to_lonlat((cell_x + 1) / size, (cell_y + 1) / size)
+    return float(min_lon), float(min_lat), float(max_lon), float(max_lat)
+
+def bbox_cell_range(bbox, resolution):
+    """Inclusive (min_x, min_y, max_x, max_y) cell range covering a bbox."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    min_x, min_y = cell_index(min_lon, max_lat, resolution)
+    max_x, max_y = cell_index(max_lon, min_lat, resolution)
+    return int(min_x), int(min_y), int(max_x), int(max_y)
@@ -0,0 +1,104 @@
+import logging
+from sqlalchemy import and_, func, inspect, select, text
+from dbConnection import Base, engine
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def managed_indexes():
+    """Return every index declared on the models, keyed by index name."""
+    return {
+        index.name: index
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    }
+
+def add_missing_columns(bind, inspector, existing_tables):
+    """
+    Add model columns that an existing table is missing. Only nullable columns
+    without server defaults are supported, which covers every column we add.
+    Returns the created columns as "table.column" strings.
+    """
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            logger.info(f"Adding column {column.name} to {table.name}")
+            with bind.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            created.append(f"{table.name}.{column.name}")
+    return created
+
+def remove_duplicate_keys(bind, index):
+    """
+    Delete the rows that would violate a unique index, keeping the first row
+    (lowest id) of each key like the incremental sync does. Rows with a NULL
+    key column never conflict. Returns the number of deleted rows.
+    """
+    table = index.table
+    columns = list(index.columns)
+    has_key = and_(*(column.isnot(None) for column in columns))
+    first_ids = select(func.min(table.c.id)).where(has_key).group_by(*columns)
+    with bind.begin() as conn:
+        deleted = conn.execute(
+            table.delete().where(has_key).where(table.c.id.notin_(first_ids))
+        ).rowcount
+    if deleted:
+        logger.warning(f"Deleted {deleted} rows of {table.name} with duplicate keys for unique index {index.name}")
+    return deleted
+
+def apply_migrations(bind=None):
+    """
+    Bring an existing database up to the current schema by adding any declared
+    columns and indexes it is missing. Tables that do not exist yet are
+    skipped; create_all() builds them together with their indexes.
+    Returns the names of the columns and indexes that were created.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    created = add_missing_columns(bind, inspector, existing_tables)
+    for name, index in managed_indexes().items():
+        table_name = index.table.name
+        if table_name not in existing_tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table_name)}
+        if name in existing:
+            continue
+        if index.unique:
+            remove_duplicate_keys(bind, index)
+        logger.info(f"Creating index {name} on {table_name}")
+        index.create(bind=bind)
+        created.append(name)
+
+    if created and bind.dialect.name == 'sqlite':
+        # Refresh planner statistics so the new indexes are picked up
+        with bind.begin() as conn:
+            conn.execute(text('ANALYZE'))
+
+    logger.info(f"Migrations applied ({len(created)} changes)")
+    return created
+
+def drop_managed_indexes(bind=None):
+    """Drop every declared index that exists. Used to benchmark the unindexed schema."""
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    for name, index in managed_indexes().items():
+        table_name = index.table.name
+        if table_name not in existing_tables:
+            continue
+        if name in {ix['name'] for ix in inspector.get_indexes(table_name)}:
+            index.drop(bind=bind)
+            logger.info(f"Dropped index {name} on {table_name}")
+
+if __name__ == "__main__":
+    apply_migrations()
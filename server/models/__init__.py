@@ -4,6 +4,9 @@ from models.crime import CrimeIncident
 from models.school import School
 from models.mbta import MBTAStop
 from models.restaurant import RestaurantInspection
+from models.neighborhood_stats import NeighborhoodStats
+from models.data_version import DataVersion
+from models.crime_density import CrimeDensityCell
 
 __all__ = [
     'NeighborhoodDemographics',
@@ -12,5 +15,8 @@ __all__ = [
     'CrimeIncident',
     'School',
     'MBTAStop',
-    'RestaurantInspection'
+    'RestaurantInspection',
+    'NeighborhoodStats',
+    'DataVersion',
+    'CrimeDensityCell'
 ] 
\ No newline at end of file
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from dbConnection import Base
 
 class CrimeIncident(Base):
     __tablename__ = 'crime_incidents_reports_clean'
+    __table_args__ = (
+        Index('ix_crime_neighborhood_date', 'neighborhood', 'date'),
+        # Natural key of the incremental sync
+        Index('ix_crime_incident_offense', 'incident_number', 'offense_code', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     incident_number = Column(String)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Index
+from dbConnection import Base
+
+class CrimeDensityCell(Base):
+    """
+    Crime counts binned into Web Mercator square cells, precomputed at load
+    time for every grid resolution. A cell at resolution r is one tile of the
+    2^r x 2^r grid covering the world.
+    """
+    __tablename__ = 'crime_density'
+    __table_args__ = (
+        Index('ix_crime_density_resolution_month', 'resolution', 'month'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    resolution = Column(Integer, nullable=False)
+    cell_x = Column(Integer, nullable=False)
+    cell_y = Column(Integer, nullable=False)
+    offense_code = Column(String)
+    # Calendar month of the incidents, as YYYY-MM
+    month = Column(String)
+    count = Column(Integer, nullable=False)
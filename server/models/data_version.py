@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, DateTime, String
+from dbConnection import Base
+
+class DataVersion(Base):
+    """
+    Single-row generation counter bumped whenever the loaders change data.
+    The epoch is a random token set when the row is created, so versions of
+    a recreated database never repeat those of the one it replaced.
+    """
+    __tablename__ = 'data_version'
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+    epoch = Column(String(32))
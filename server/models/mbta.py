@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from dbConnection import Base
 
 class MBTAStop(Base):
     __tablename__ = 'mbta_stops_clean'
+    __table_args__ = (
+        Index('ix_mbta_stop_neighborhood', 'neighborhood'),
+        # Natural key of the incremental sync
+        Index('ix_mbta_stop_id', 'stop_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     stop_id = Column(String)
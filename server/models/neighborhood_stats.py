@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from dbConnection import Base
+
+class NeighborhoodStats(Base):
+    """
+    Per-neighborhood aggregates materialized at load time. The row with a NULL
+    neighborhood holds the city-wide values.
+    """
+    __tablename__ = 'neighborhood_stats'
+
+    id = Column(Integer, primary_key=True)
+    neighborhood = Column(String, unique=True)
+    # Property values (only properties with a positive total_value, except the
+    # average which covers every assessed property)
+    property_count = Column(Integer)
+    median_property_value = Column(Float)
+    p10_property_value = Column(Float)
+    p25_property_value = Column(Float)
+    p75_property_value = Column(Float)
+    p90_property_value = Column(Float)
+    avg_property_value = Column(Float)
+    # Serialized t-digest of property values, mergeable across neighborhoods
+    property_value_digest = Column(Text)
+    median_living_area = Column(Float)
+    p25_living_area = Column(Float)
+    p75_living_area = Column(Float)
+    median_year_built = Column(Float)
+    p25_year_built = Column(Float)
+    p75_year_built = Column(Float)
+    # Crime
+    crime_count = Column(Integer)
+    avg_crime_rate = Column(Float)
+    median_crime_rate = Column(Float)
+    # Amenities
+    school_count = Column(Integer)
+    mbta_stops_count = Column(Integer)
+    restaurant_count = Column(Integer)
+    updated_at = Column(DateTime)
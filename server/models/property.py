@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from dbConnection import Base
 
 class PropertyAssessment(Base):
     __tablename__ = 'property_assessment_fy2025_clean'
+    __table_args__ = (
+        Index('ix_property_neighborhood_total_value', 'neighborhood', 'total_value'),
+        # Natural key of the incremental sync
+        Index('ix_property_pid', 'pid', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     pid = Column(String)
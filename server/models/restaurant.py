@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from dbConnection import Base
 
 class RestaurantInspection(Base):
     __tablename__ = 'restaurant_inspection_clean'
+    __table_args__ = (
+        Index('ix_restaurant_neighborhood', 'neighborhood'),
+    )
     
     id = Column(Integer, primary_key=True)
     business_name = Column(String)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from dbConnection import Base
 
 class School(Base):
     __tablename__ = 'school_clean'
+    __table_args__ = (
+        Index('ix_school_neighborhood', 'neighborhood'),
+    )
     
     id = Column(Integer, primary_key=True)
     address = Column(String)
@@ -0,0 +1,97 @@
+import struct
+
+# Minimal Mapbox Vector Tile (spec v2.1) encoder for point layers. Writes the
+# protobuf wire format directly so no protobuf runtime is needed.
+
+# Default tile extent (coordinate space of a tile)
+EXTENT = 4096
+
+# Protobuf wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+
+# Geometry types and commands
+POINT = 1
+MOVE_TO = 1
+
+def _varint(value):
+    """Encode a non-negative integer as a protobuf varint."""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+def _bytes_field(field, payload):
+    return _key(field, LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+def _varint_field(field, value):
+    return _key(field, VARINT) + _varint(value)
+
+def _packed_field(field, values):
+    return _bytes_field(field, b''.join(_varint(v) for v in values))
+
+def _encode_value(value):
+    """Encode a property as a Tile.Value message."""
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _varint_field(5, value)
+        return _varint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _key(3, FIXED64) + struct.pack('<d', value)
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+def point_geometry(x, y, cursor=(0, 0)):
+    """Command integers for a single point relative to the cursor."""
+    return [(MOVE_TO & 0x7) | (1 << 3), _zigzag(x - cursor[0]), _zigzag(y - cursor[1])]
+
+def encode_layer(name, features, extent=EXTENT):
+    """
+    Encode one layer. Features are (id, x, y, properties) tuples with x/y in
+    tile coordinates; id may be None and properties with None values are skipped.
+    """
+    keys, values = {}, {}
+    encoded_features = []
+    for feature_id, x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            # Distinguish 1 from 1.0 and True so each keeps its protobuf type
+            tags.append(values.setdefault((type(value), value), len(values)))
+        feature = b''
+        if feature_id is not None:
+            feature += _varint_field(1, feature_id)
+        if tags:
+            feature += _packed_field(2, tags)
+        feature += _varint_field(3, POINT)
+        feature += _packed_field(4, point_geometry(x, y))
+        encoded_features.append(_bytes_field(2, feature))
+
+    layer = _varint_field(15, 2) + _bytes_field(1, name.encode('utf-8'))
+    layer += b''.join(encoded_features)
+    layer += b''.join(_bytes_field(3, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_bytes_field(4, _encode_value(value)) for _, value in values)
+    layer += _varint_field(5, extent)
+    return layer
+
+def encode_tile(layers, extent=EXTENT):
+    """Encode a tile from a dict of layer name -> features. Empty layers are omitted."""
+    return b''.join(
+        _bytes_field(3, encode_layer(name, features, extent))
+        for name, features in layers.items() if features
+    )
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import numpy as np
+from sklearn.neighbors import BallTree
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from data_version import VersionTracker, get_data_version_key
+from spatial_index import POINT_LAYERS, PointLayer
+
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius; the haversine metric works in radians on the unit sphere
+EARTH_RADIUS_M = 6371008.8
+
+DEFAULT_RADIUS_M = 800
+MAX_RADIUS_M = 5000
+MAX_K = 100
+DEFAULT_NEARBY_LAYERS = ['schools', 'stops', 'restaurants']
+
+def parse_point(lat, lon):
+    """Parse the lat/lon query parameters."""
+    if lat is None or lon is None:
+        raise ValueError("lat and lon are required")
+    try:
+        lat, lon = float(lat), float(lon)
+    except ValueError:
+        raise ValueError("lat and lon must be numbers")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+    return lat, lon
+
+def parse_radius(value, default=None):
+    """Parse the radius in meters, capped at MAX_RADIUS_M."""
+    if value is None:
+        return default
+    try:
+        radius = float(value)
+    except ValueError:
+        raise ValueError("radius must be a number of meters")
+    if not 0 < radius <= MAX_RADIUS_M:
+        raise ValueError(f"radius must be between 0 and {MAX_RADIUS_M} meters")
+    return radius
+
+def parse_k(value):
+    """Parse the number of nearest points per layer."""
+    if value is None:
+        return None
+    try:
+        k = int(value)
+    except ValueError:
+        raise ValueError("k must be an integer")
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+    return k
+
+def parse_layers(value):
+    """Parse a comma-separated list of point layers."""
+    if not value:
+        return list(DEFAULT_NEARBY_LAYERS)
+    layers = [layer.strip() for layer in value.split(',') if layer.strip()]
+    unknown = [layer for layer in layers if layer not in POINT_LAYERS]
+    if unknown or not layers:
+        raise ValueError(f"layers must be a subset of {', '.join(POINT_LAYERS)}")
+    return list(dict.fromkeys(layers))
+
+class NearbyLayer:
+    """A point layer with a haversine BallTree over its coordinates."""
+
+    def __init__(self, layer: PointLayer):
+        self.layer = layer
+        # BallTree rejects empty input; query() returns nothing for empty layers
+        self.tree = None
+        if len(layer):
+            self.tree = BallTree(np.radians(np.column_stack([layer.lat, layer.lon])), metric='haversine')
+
+    def __len__(self):
+        return len(self.layer)
+
+    def query(self, lat, lon, radius=None, k=None):
+        """
+        Points around (lat, lon) sorted by distance: the k nearest when k is
+        set, limited to radius meters when it is set. Returns (indices into
+        the layer, distances in meters).
+        """
+        if not len(self.layer):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        point = np.radians([[lat, lon]])
+        if k is not None:
+            distances, indices = self.tree.query(point, k=min(k, len(self.layer)))
+            distances, indices = distances[0] * EARTH_RADIUS_M, indices[0]
+            if radius is not None:
+                within = distances <= radius
+                distances, indices = distances[within], indices[within]
+            return indices, distances
+        indices, distances = self.tree.query_radius(
+            point, r=radius / EARTH_RADIUS_M, return_distance=True, sort_results=True
+        )
+        return indices[0], distances[0] * EARTH_RADIUS_M
+
+    def features(self, indices, distances):
+        """Output dicts for query results."""
+        layer = self.layer
+        return [
+            {
+                'id': int(layer.ids[i]),
+                'latitude': float(layer.lat[i]),
+                'longitude': float(layer.lon[i]),
+                'distance_m': round(float(distance), 1),
+                **{key: values[i] for key, values in layer.properties.items()},
+            }
+            for i, distance in zip(indices, distances)
+        ]
+
+class NearbyIndex:
+    """
+    Process-wide BallTrees for every point layer, rebuilt when the loaders
+    bump the data version.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.versions = VersionTracker(check_interval)
+        self._version = None
+        self._layers = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session, version=None):
+        """(Re)build the trees of all layers from the Arrow snapshot or the database."""
+        with self._lock:
+            start = time.perf_counter()
+            if version is None:
+                version = get_data_version_key(db)
+            elif self._version == version:
+                # Another thread finished the reload while this one waited
+                return self._layers
+            layers = {name: NearbyLayer(self._load_layer(db, name, version)) for name in POINT_LAYERS}
+            self._layers, self._version = layers, version
+            logger.info(
+                f"Nearby index built for {sum(len(layer) for layer in layers.values())} points "
+                f"(data version {version}) in {time.perf_counter() - start:.2f}s"
+            )
+        return self._layers
+
+    @staticmethod
+    def _load_layer(db: Session, name, version):
+        """Load a layer, or an empty one when its table is missing or unreadable."""
+        try:
+            return PointLayer.load(db, name, version)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Nearby layer '{name}' is empty: {e}")
+            return PointLayer.from_points(name, [], [], [], {key: [] for key in POINT_LAYERS[name]['properties']})
+
+    def get(self, db: Session):
+        """Return the current layers, rebuilding them if the data changed."""
+        layers = self._layers
+        version = self.versions.current_key(db)
+        if not layers or self._version != version:
+            return self.load(db, version)
+        return layers
+
+    def nearby(self, db: Session, lat, lon, layers, radius=None, k=None):
+        """
+        Query several layers around a point. Returns a dict of layer name ->
+        {'count': ..., 'features': [...]} with features sorted by distance.
+        """
+        indexed = self.get(db)
+        result = {}
+        for name in layers:
+            indices, distances = indexed[name].query(lat, lon, radius, k)
+            result[name] = {
+                'count': len(indices),
+                'features': indexed[name].features(indices, distances),
+            }
+        return result
+
+nearby_index = NearbyIndex()
@@ -0,0 +1,51 @@
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session
+from aggregation import neighborhood_metrics
+from models import NeighborhoodStats
+
+logger = logging.getLogger(__name__)
+
+# Statistic columns of NeighborhoodStats, i.e. everything except the keys
+STAT_COLUMNS = [
+    c.name for c in NeighborhoodStats.__table__.columns
+    if c.name not in ('id', 'neighborhood', 'updated_at')
+]
+
+def compute_neighborhood_stats(db: Session):
+    """
+    Compute the NeighborhoodStats rows from the source tables.
+    Returns a DataFrame indexed by neighborhood, with None for the city-wide row.
+    """
+    return neighborhood_metrics(db).reindex(columns=STAT_COLUMNS)
+
+def refresh_neighborhood_stats(db: Session):
+    """Recompute and replace the materialized neighborhood_stats table."""
+    try:
+        stats = compute_neighborhood_stats(db)
+        updated_at = datetime.utcnow()
+        records = [
+            dict(row, neighborhood=neighborhood, updated_at=updated_at)
+            for neighborhood, row in zip(stats.index, stats.astype(object).to_dict('records'))
+        ]
+        table = NeighborhoodStats.__table__
+        db.execute(table.delete())
+        db.execute(table.insert(), records)
+        db.commit()
+        logger.info(f"Neighborhood stats refreshed for {len(records) - 1} neighborhoods")
+    except Exception as e:
+        logger.error(f"Error refreshing neighborhood stats: {e}")
+        db.rollback()
+
+def get_neighborhood_stats(db: Session):
+    """
+    Return the materialized stats as a dict of neighborhood -> stats dict, with
+    the city-wide stats under None. Falls back to computing them when the table
+    has not been populated yet.
+    """
+    rows = db.query(NeighborhoodStats).all()
+    if not rows:
+        logger.warning("neighborhood_stats is empty; computing stats on the fly")
+        stats = compute_neighborhood_stats(db)
+        return dict(zip(stats.index, stats.astype(object).to_dict('records')))
+    return {row.neighborhood: {c: getattr(row, c) for c in STAT_COLUMNS} for row in rows}
@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from arrow_snapshot import PROPERTY_TABLE, column_array, read_table
+from data_version import VersionTracker, get_data_version_key
+from quantiles import grouped_quantiles
+from models import PropertyAssessment
+
+logger = logging.getLogger(__name__)
+
+class PropertySnapshot:
+    """
+    Immutable columnar copy of the property table: one NumPy array per column
+    used by the search filters, with neighborhoods stored as integer codes.
+    """
+
+    def __init__(self, version, names, codes, values, bedrooms, bathrooms):
+        self.version = version
+        self.names = names
+        self.codes = codes
+        self.values = values
+        self.bedrooms = bedrooms
+        self.bathrooms = bathrooms
+        self.lookup = {name: code for code, name in enumerate(names)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_db(cls, db: Session, version):
+        """Read the searchable property columns into arrays."""
+        rows = db.execute(
+            select(PropertyAssessment.neighborhood, PropertyAssessment.total_value,
+                   PropertyAssessment.bed_rms, PropertyAssessment.full_bth, PropertyAssessment.hlf_bth)
+            .order_by(PropertyAssessment.id)
+        ).all()
+        columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+        neighborhoods, values, bedrooms, full_baths, half_baths = columns
+
+        # Code neighborhoods in order of first appearance; None is a group of its own
+        lookup = {}
+        codes = np.fromiter((lookup.setdefault(n, len(lookup)) for n in neighborhoods),
+                            dtype=np.int32, count=len(neighborhoods))
+
+        def to_float(column, fill=np.nan):
+            return np.array([fill if v is None else v for v in column], dtype=float)
+
+        return cls(
+            version,
+            list(lookup),
+            codes,
+            to_float(values),
+            to_float(bedrooms),
+            to_float(full_baths, 0.0) + to_float(half_baths, 0.0) * 0.5,
+        )
+
+    @classmethod
+    def from_arrow(cls, table, version):
+        """Wrap the property table of the Arrow snapshot; the arrays are zero-copy views of the mapped file."""
+        return cls(
+            version,
+            json.loads(table.schema.metadata[b'names']),
+            column_array(table, 'neighborhood'),
+            column_array(table, 'total_value'),
+            column_array(table, 'bedrooms'),
+            column_array(table, 'bathrooms'),
+        )
+
+    def search(self, neighborhood=None, min_price=0, max_price=float('inf'), bedrooms=None, bathrooms=None):
+        """
+        Filter with boolean masks and summarize the matches per neighborhood.
+        Mirrors the SQL filters: rows with a missing value fail any filter on it.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if neighborhood:
+            if neighborhood not in self.lookup:
+                return []
+            mask &= self.codes == self.lookup[neighborhood]
+        if min_price > 0:
+            mask &= self.values >= min_price
+        if max_price < float('inf'):
+            mask &= self.values <= max_price
+        if bedrooms is not None:
+            mask &= self.bedrooms == bedrooms
+        if bathrooms is not None:
+            mask &= self.bathrooms == bathrooms
+
+        codes = self.codes[mask]
+        values = self.values[mask]
+        if len(codes) == 0:
+            return []
+
+        # Neighborhoods in the order their first matching property appears
+        matched, first_seen = np.unique(codes, return_index=True)
+        matched = matched[np.argsort(first_seen)]
+
+        valid = values > 0
+        counts = np.bincount(codes[valid], minlength=len(self.names))
+        medians = grouped_quantiles(codes[valid], values[valid], [0.5])
+
+        return [
+            {
+                'neighborhood': self.names[code],
+                'median_price': float(medians[code][0]) if code in medians else 0.0,
+                'property_count': int(counts[code]),
+            }
+            for code in matched
+        ]
+
+class PropertyStore:
+    """
+    Process-wide holder of the current PropertySnapshot. The snapshot is
+    rebuilt when the loaders bump the data version.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.versions = VersionTracker(check_interval)
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def load(self, db: Session, version=None):
+        """
+        (Re)build the snapshot, mapping the loaders' Arrow snapshot when it
+        matches the data version and reading the database otherwise.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            if version is None:
+                version = get_data_version_key(db)
+            elif self._snapshot is not None and self._snapshot.version == version:
+                # Another thread finished the reload while this one waited
+                return self._snapshot
+            table = read_table(PROPERTY_TABLE, version)
+            if table is not None:
+                self._snapshot, source = PropertySnapshot.from_arrow(table, version), 'Arrow snapshot'
+            else:
+                self._snapshot, source = PropertySnapshot.from_db(db, version), 'database'
+            logger.info(
+                f"Property store loaded {len(self._snapshot)} properties from the {source} "
+                f"(data version {version}) in {time.perf_counter() - start:.2f}s"
+            )
+        return self._snapshot
+
+    def get(self, db: Session):
+        """Return the current snapshot, reloading it if the data changed."""
+        snapshot = self._snapshot
+        version = self.versions.current_key(db)
+        if snapshot is None or snapshot.version != version:
+            return self.load(db, version)
+        return snapshot
+
+property_store = PropertyStore()
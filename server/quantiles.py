@@ -0,0 +1,183 @@
+import math
+import numpy as np
+
+# Default t-digest compression. Higher values keep more centroids and give
+# tighter estimates; 200 keeps about 100 centroids and rank errors near 0.1%.
+DEFAULT_COMPRESSION = 200
+
+def _as_array(values):
+    """Return the non-missing values as a float array."""
+    array = np.asarray(values, dtype=float).ravel()
+    return array[~np.isnan(array)]
+
+def exact_quantiles(values, qs):
+    """
+    Exact quantiles using partition-based selection instead of a full sort.
+    Interpolates linearly between order statistics, like numpy/pandas.
+    Missing values are ignored; returns None for each quantile when empty.
+    """
+    array = _as_array(values)
+    n = len(array)
+    if n == 0:
+        return [None for _ in qs]
+
+    positions = np.asarray(qs, dtype=float) * (n - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.ceil(positions).astype(int)
+    partitioned = np.partition(array, np.unique(np.concatenate([lower, upper])))
+    low_values = partitioned[lower]
+    high_values = partitioned[upper]
+    result = low_values + (high_values - low_values) * (positions - lower)
+    return [float(v) for v in result]
+
+def median(values):
+    """Exact median of the non-missing values, or None when there are none."""
+    return exact_quantiles(values, [0.5])[0]
+
+def grouped_quantiles(keys, values, qs):
+    """
+    Exact quantiles of values per distinct key in a single pass over the data.
+    Returns a dict of key -> list of quantiles; missing values and keys are ignored.
+    Integer keys (e.g. category codes) skip the per-element missing-key check.
+    """
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    if keys.dtype.kind not in 'iu':
+        keys = keys.astype(object)
+        present &= np.array([key is not None and key == key for key in keys], dtype=bool)
+    keys, values = keys[present], values[present]
+    if len(keys) == 0:
+        return {}
+
+    uniques, codes = np.unique(keys, return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    grouped = values[order]
+    return {
+        uniques[i]: exact_quantiles(grouped[bounds[i]:bounds[i + 1]], qs)
+        for i in range(len(uniques))
+    }
+
+class TDigest:
+    """
+    Mergeable streaming quantile sketch (merging t-digest). Values are buffered
+    and folded into a bounded set of weighted centroids, so building it never
+    sorts more than a buffer at a time. Digests built per neighborhood can be
+    merged to answer city-wide quantiles.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or int(compression * 5)
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        """Build a digest from an array of values."""
+        digest = cls(compression)
+        digest.update(values)
+        return digest
+
+    def update(self, values):
+        """Add an array of values to the digest."""
+        array = _as_array(values)
+        for start in range(0, len(array), self.buffer_size):
+            self._buffer.append(array[start:start + self.buffer_size])
+            if sum(len(b) for b in self._buffer) >= self.buffer_size:
+                self._flush()
+        return self
+
+    def merge(self, other):
+        """Fold another digest into this one."""
+        other._flush()
+        self._flush()
+        if other.count == 0:
+            return self
+        self._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights])
+        )
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _flush(self):
+        """Compress buffered values into the centroids."""
+        if not self._buffer:
+            return
+        values = np.concatenate(self._buffer)
+        self._buffer = []
+        if len(values) == 0:
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))])
+        )
+
+    def _compress(self, means, weights):
+        """
+        Merge sorted centroids so each one spans at most one unit of the k1
+        scale function, which keeps centroids small near the tails.
+        """
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        midpoints = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * np.clip(midpoints, 0, 1) - 1)
+        bins = np.floor(k - k.min()).astype(np.int64)
+        bins = np.unique(bins, return_inverse=True)[1]
+        merged_weights = np.bincount(bins, weights=weights)
+        self.means = np.bincount(bins, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+        self.count = int(round(total))
+
+    def quantiles(self, qs):
+        """Estimated quantiles for each q in qs; None when the digest is empty."""
+        self._flush()
+        if self.count == 0:
+            return [None for _ in qs]
+        if len(self.means) == 1:
+            return [float(self.means[0]) for _ in qs]
+
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Anchor the interpolation at the exact extremes
+        positions = np.concatenate([[0.0], centers, [float(self.count)]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        targets = np.asarray(qs, dtype=float) * self.count
+        return [float(v) for v in np.interp(targets, positions, values)]
+
+    def quantile(self, q):
+        """Estimated quantile q."""
+        return self.quantiles([q])[0]
+
+    def to_dict(self):
+        """Serialize the digest to a JSON-compatible dict."""
+        self._flush()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a digest serialized with to_dict()."""
+        digest = cls(data.get('compression', DEFAULT_COMPRESSION))
+        digest.means = np.asarray(data['means'], dtype=float)
+        digest.weights = np.asarray(data['weights'], dtype=float)
+        digest.count = data['count']
+        if digest.count:
+            digest.min = data['min']
+            digest.max = data['max']
+        return digest
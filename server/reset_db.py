@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 import logging
-from dbConnection import init_db, SessionLocal, Base, engine
+from dbConnection import init_db, SessionLocal, Base, engine, IS_SQLITE
 from models import (
     NeighborhoodDemographics,
     PropertyAssessment,
@@ -18,13 +18,15 @@ logger = logging.getLogger(__name__)
 def reset_database():
     """Reset the database by dropping all tables and recreating them."""
     try:
-        # Get database path
-        db_path = Path('data/processed/real_estate.db')
-        
-        # Delete database file if it exists
-        if db_path.exists():
-            os.remove(db_path)
-            logger.info("Deleted existing database file")
+        # Delete the database file (and its WAL files) when DATABASE_URL
+        # points at a SQLite file; server databases only drop their tables
+        if IS_SQLITE and engine.url.database not in (None, '', ':memory:'):
+            db_path = Path(engine.url.database)
+            engine.dispose()
+            for path in (db_path, Path(f'{db_path}-wal'), Path(f'{db_path}-shm')):
+                if path.exists():
+                    os.remove(path)
+                    logger.info(f"Deleted existing database file {path}")
         
         # Drop all tables
         Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import logging
+import zlib
+from flask import Response, request
+from data_version import data_versions
+from cache_backend import served_data_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Responses under these prefixes get ETags, conditional GET and compression
+MANAGED_PREFIXES = ('/api/', '/tiles/')
+
+# Endpoints whose responses do not derive from the loaded data
+UNVERSIONED_PATHS = {'/api/health'}
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/geo+json',
+    'application/x-ndjson',
+    'application/vnd.mapbox-vector-tile',
+    'text/plain',
+    'text/html',
+}
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+# Brotli quality for responses compressed per request; prebuilt artifacts use 11
+BROTLI_QUALITY = 5
+
+def _managed():
+    return request.method in ('GET', 'HEAD') and request.path.startswith(MANAGED_PREFIXES)
+
+def request_etag(version):
+    """
+    ETag for the current request: responses are a function of the URL and the
+    loaded data, so the data version and the full path identify them.
+    """
+    digest = hashlib.sha1(request.full_path.encode('utf-8')).hexdigest()[:16]
+    return f"v{version}-{digest}"
+
+def last_modified(version):
+    """
+    Load time of the served data. Unknown while stale payloads of an older
+    version are served during a cache warm-up.
+    """
+    if version != data_versions.current_version_key:
+        return None
+    return data_versions.updated_at
+
+def negotiate_encoding():
+    """Preferred content encoding the client accepts, or None."""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress(data, encoding):
+    """Compress a whole body with the negotiated encoding."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body chunk by chunk, flushing so clients can decode as it arrives."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            out = compressor.process(data) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+    else:
+        # wbits=31 writes a gzip container
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            out = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield compressor.flush()
+
+def check_not_modified():
+    """Answer conditional GETs with 304 before the endpoint runs."""
+    if not _managed() or request.path in UNVERSIONED_PATHS:
+        return None
+    if not request.if_none_match and not request.if_modified_since:
+        return None
+
+    version = served_data_version()
+    etag = request_etag(version)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        # HTTP dates have second precision; updated_at is naive UTC
+        updated_at = last_modified(version)
+        since = request.if_modified_since.replace(tzinfo=None)
+        not_modified = updated_at is not None and updated_at.replace(microsecond=0) <= since
+    if not not_modified:
+        return None
+
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def finalize_response(response):
+    """Add validators and compress managed responses."""
+    if not _managed():
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if response.status_code == 200 and request.path not in UNVERSIONED_PATHS and 'ETag' not in response.headers:
+        version = served_data_version()
+        response.set_etag(request_etag(version), weak=True)
+        if last_modified(version) is not None:
+            response.last_modified = last_modified(version)
+        # Let clients keep the body but revalidate it on every use
+        response.headers.setdefault('Cache-Control', 'no-cache')
+
+    if (
+        response.status_code != 200
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_response_layer(app):
+    """Register the conditional GET and compression hooks on the app."""
+    app.before_request(check_not_modified)
+    app.after_request(finalize_response)
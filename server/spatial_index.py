@@ -0,0 +1,141 @@
+import logging
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from arrow_snapshot import PROPERTY_PREFIX, ArrowValues, column_array, read_table
+from mercator import lonlat_to_world
+from models import CrimeIncident, School, MBTAStop, RestaurantInspection
+
+logger = logging.getLogger(__name__)
+
+# Point layers served to the map, keyed by layer name. Properties map the
+# output attribute name to its column.
+POINT_LAYERS = {
+    'crimes': {
+        'model': CrimeIncident,
+        'longitude': CrimeIncident.longitude,
+        'latitude': CrimeIncident.latitude,
+        'properties': {
+            'type': CrimeIncident.offense_code,
+            'description': CrimeIncident.offense_description,
+            'neighborhood': CrimeIncident.neighborhood,
+        },
+    },
+    'schools': {
+        'model': School,
+        'longitude': School.longitude,
+        'latitude': School.latitude,
+        'properties': {
+            'name': School.name,
+            'address': School.address,
+            'neighborhood': School.neighborhood,
+        },
+    },
+    'stops': {
+        'model': MBTAStop,
+        'longitude': MBTAStop.stop_lon,
+        'latitude': MBTAStop.stop_lat,
+        'properties': {
+            'name': MBTAStop.stop_name,
+            'url': MBTAStop.stop_url,
+            'wheelchair_boarding': MBTAStop.wheelchair_boarding,
+            'neighborhood': MBTAStop.neighborhood,
+        },
+    },
+    'restaurants': {
+        'model': RestaurantInspection,
+        'longitude': RestaurantInspection.longitude,
+        'latitude': RestaurantInspection.latitude,
+        'properties': {
+            'name': RestaurantInspection.business_name,
+            'address': RestaurantInspection.address,
+            'neighborhood': RestaurantInspection.neighborhood,
+        },
+    },
+}
+
+class PointLayer:
+    """
+    Points of one layer in Web Mercator world coordinates, sorted by x so a
+    bounding box query is a binary search on x followed by a mask on y.
+    """
+
+    def __init__(self, name, ids, lon, lat, x, y, properties):
+        self.name = name
+        self.ids = ids
+        self.lon = lon
+        self.lat = lat
+        self.x = x
+        self.y = y
+        self.properties = properties
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_points(cls, name, ids, lon, lat, properties):
+        """Project unordered points and sort them by x."""
+        x, y = lonlat_to_world(lon, lat)
+        order = np.argsort(x, kind='stable')
+        return cls(
+            name,
+            np.asarray(ids, dtype=np.int64)[order],
+            np.asarray(lon, dtype=float)[order],
+            np.asarray(lat, dtype=float)[order],
+            x[order],
+            y[order],
+            {key: np.asarray(values, dtype=object)[order] for key, values in properties.items()},
+        )
+
+    @classmethod
+    def from_db(cls, db: Session, name):
+        """Load a layer declared in POINT_LAYERS."""
+        definition = POINT_LAYERS[name]
+        model = definition['model']
+        property_names = list(definition['properties'])
+        rows = db.execute(
+            select(model.id, definition['longitude'], definition['latitude'],
+                   *definition['properties'].values())
+            .where(definition['longitude'].isnot(None), definition['latitude'].isnot(None))
+        ).all()
+        columns = list(zip(*rows)) if rows else [()] * (3 + len(property_names))
+        layer = cls.from_points(
+            name, columns[0], columns[1], columns[2],
+            {key: columns[3 + i] for i, key in enumerate(property_names)}
+        )
+        logger.info(f"Loaded {len(layer)} points into spatial index '{name}'")
+        return layer
+
+    @classmethod
+    def from_arrow(cls, name, table):
+        """
+        Wrap a layer table of the Arrow snapshot. Coordinates are zero-copy
+        views of the mapped file and properties are read on access.
+        """
+        return cls(
+            name,
+            column_array(table, 'id'),
+            column_array(table, 'longitude'),
+            column_array(table, 'latitude'),
+            column_array(table, 'x'),
+            column_array(table, 'y'),
+            {key: ArrowValues(table.column(PROPERTY_PREFIX + key)) for key in POINT_LAYERS[name]['properties']},
+        )
+
+    @classmethod
+    def load(cls, db: Session, name, version):
+        """Load a layer from the snapshot of the given data version, or from the database."""
+        table = read_table(name, version)
+        if table is None:
+            return cls.from_db(db, name)
+        layer = cls.from_arrow(name, table)
+        logger.info(f"Mapped {len(layer)} points of spatial index '{name}' from the Arrow snapshot")
+        return layer
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """Indices of the points inside a world-coordinate bounding box."""
+        start = np.searchsorted(self.x, min_x, side='left')
+        stop = np.searchsorted(self.x, max_x, side='right')
+        candidates = np.arange(start, stop)
+        ys = self.y[start:stop]
+        return candidates[(ys >= min_y) & (ys <= max_y)]
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The server modules import each other as top-level modules
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+# Keep the tests away from the configured database: dbConnection builds its
+# engines from DATABASE_URL at import time. The tests create their own engines.
+os.environ['DATABASE_URL'] = 'sqlite://'
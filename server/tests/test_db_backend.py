@@ -0,0 +1,178 @@
+"""
+Tests of the database backend abstraction against an in-memory SQLite
+database and the PostgreSQL dialect. Set TEST_POSTGRES_URL to a scratch
+PostgreSQL database to also run them against a live server.
+"""
+import csv
+import io
+import os
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from dbConnection import Base
+from db_backend import _copy_records, _csv_field, bbox_filter, insert_records, month_bucket
+from models import CrimeIncident, School
+
+TEST_POSTGRES_URL = os.getenv('TEST_POSTGRES_URL')
+
+SCHOOLS = [
+    {'id': 1, 'name': 'Inside', 'address': '1 Main St', 'latitude': 42.35, 'longitude': -71.06, 'neighborhood': 'Back Bay'},
+    {'id': 2, 'name': 'Edge', 'address': '2 Main St', 'latitude': 42.30, 'longitude': -71.10, 'neighborhood': 'Roxbury'},
+    {'id': 3, 'name': 'Outside', 'address': '3 Main St', 'latitude': 42.40, 'longitude': -71.20, 'neighborhood': 'Brighton'},
+]
+BBOX = (-71.10, 42.30, -71.00, 42.36)
+
+def compile_sql(clause, dialect):
+    return str(clause.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+@pytest.fixture
+def sqlite_session():
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def postgres_session():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+@pytest.mark.parametrize('dialect, expected', [
+    (sqlite.dialect(), "strftime('%Y-%m', crime_incidents_reports_clean.date)"),
+    (postgresql.dialect(), "to_char(crime_incidents_reports_clean.date, 'YYYY-MM')"),
+    (mysql.dialect(), "date_format(crime_incidents_reports_clean.date, '%%Y-%%m')"),
+])
+def test_month_bucket_compiles_per_dialect(dialect, expected):
+    assert compile_sql(month_bucket(CrimeIncident.date), dialect) == expected
+
+def test_month_bucket_groups_by_month_on_sqlite(sqlite_session):
+    sqlite_session.add_all([
+        CrimeIncident(id=1, date=datetime(2023, 5, 1, 10)),
+        CrimeIncident(id=2, date=datetime(2023, 5, 31, 23)),
+        CrimeIncident(id=3, date=datetime(2023, 6, 1, 0)),
+    ])
+    sqlite_session.flush()
+    month = month_bucket(CrimeIncident.date)
+    rows = sqlite_session.execute(
+        select(month, CrimeIncident.id).order_by(CrimeIncident.id)
+    ).all()
+    assert [row[0] for row in rows] == ['2023-05', '2023-05', '2023-06']
+
+def test_bbox_filter_without_spatial_uses_coordinate_ranges(sqlite_session):
+    sqlite_session.execute(School.__table__.insert(), SCHOOLS)
+    names = sqlite_session.execute(
+        select(School.name).where(bbox_filter(School, BBOX)).order_by(School.id)
+    ).scalars().all()
+    # Points on the box's edges are inside
+    assert names == ['Inside', 'Edge']
+
+def test_bbox_filter_without_spatial_compiles_for_postgresql():
+    sql = compile_sql(bbox_filter(School, BBOX), postgresql.dialect())
+    assert 'school_clean.longitude BETWEEN -71.1 AND -71.0' in sql
+    assert 'school_clean.latitude BETWEEN 42.3 AND 42.36' in sql
+    assert 'geom' not in sql
+
+def test_bbox_filter_spatial_uses_geometry_envelope():
+    clause = bbox_filter(School, BBOX, spatial=True)
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+    assert sql == (
+        'school_clean.geom && ST_MakeEnvelope(%(min_lon)s, %(min_lat)s, %(max_lon)s, %(max_lat)s, 4326)'
+    )
+    params = clause.compile(dialect=postgresql.dialect()).params
+    assert params == {'min_lon': -71.10, 'min_lat': 42.30, 'max_lon': -71.00, 'max_lat': 42.36}
+
+@pytest.mark.parametrize('value, expected', [
+    (None, ''),
+    ('', '""'),
+    ('plain', '"plain"'),
+    ('say "hi"', '"say ""hi"""'),
+    ('a,b', '"a,b"'),
+    ('two\nlines', '"two\nlines"'),
+    (3, '3'),
+    (2.5, '2.5'),
+    (datetime(2023, 5, 1, 10, 30), '2023-05-01 10:30:00'),
+])
+def test_csv_field(value, expected):
+    assert _csv_field(value) == expected
+
+class FakeCursor:
+    """DBAPI cursor stand-in recording what psycopg2's copy_expert receives."""
+
+    def __init__(self):
+        self.sql = None
+        self.data = None
+        self.closed = False
+
+    def copy_expert(self, sql, file):
+        self.sql = sql
+        self.data = file.read()
+
+    def close(self):
+        self.closed = True
+
+class FakeSession:
+    """Session stand-in whose connection wraps a DBAPI connection handing out a FakeCursor."""
+
+    def __init__(self):
+        self.cursor = FakeCursor()
+
+    def connection(self):
+        return SimpleNamespace(connection=SimpleNamespace(cursor=lambda: self.cursor))
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=postgresql.dialect())
+
+def test_copy_records_streams_escaped_csv():
+    session = FakeSession()
+    records = [
+        {'id': 1, 'name': 'Quote "A"', 'address': None, 'latitude': 42.35, 'longitude': -71.06, 'neighborhood': ''},
+        {'id': 2, 'name': 'Comma, B', 'address': 'Line\nbreak', 'latitude': None, 'longitude': -71.1, 'neighborhood': 'Roxbury'},
+    ]
+
+    _copy_records(session, School.__table__, records)
+
+    cursor = session.cursor
+    assert cursor.sql == (
+        'COPY school_clean (id, name, address, latitude, longitude, neighborhood) FROM STDIN WITH (FORMAT csv)'
+    )
+    assert cursor.closed
+    rows = list(csv.reader(io.StringIO(cursor.data)))
+    assert rows == [
+        ['1', 'Quote "A"', '', '42.35', '-71.06', ''],
+        ['2', 'Comma, B', 'Line\nbreak', '', '-71.1', 'Roxbury'],
+    ]
+    # COPY reads unquoted empty fields as NULL and quoted ones as empty strings
+    assert cursor.data.splitlines()[0] == '1,"Quote ""A""",,42.35,-71.06,""'
+
+def test_insert_records_uses_copy_on_postgresql():
+    session = FakeSession()
+    insert_records(session, School.__table__, SCHOOLS)
+    assert session.cursor.sql.startswith('COPY school_clean ')
+    assert len(session.cursor.data.splitlines()) == len(SCHOOLS)
+
+def test_insert_records_uses_executemany_on_sqlite(sqlite_session):
+    insert_records(sqlite_session, School.__table__, SCHOOLS)
+    insert_records(sqlite_session, School.__table__, [])
+    assert sqlite_session.query(School).count() == len(SCHOOLS)
+
+def test_postgres_round_trip(postgres_session):
+    insert_records(postgres_session, School.__table__, SCHOOLS)
+    postgres_session.add(CrimeIncident(id=1, date=datetime(2023, 5, 31, 23)))
+    postgres_session.flush()
+    names = postgres_session.execute(
+        select(School.name).where(bbox_filter(School, BBOX)).order_by(School.id)
+    ).scalars().all()
+    assert names == ['Inside', 'Edge']
+    assert postgres_session.execute(select(month_bucket(CrimeIncident.date))).scalar() == '2023-05'
@@ -0,0 +1,208 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+from pathlib import Path
+from sqlalchemy.orm import Session
+from dbConnection import PROJECT_ROOT
+from data_version import VersionTracker
+from mvt import EXTENT, encode_tile
+from spatial_index import POINT_LAYERS, PointLayer
+
+logger = logging.getLogger(__name__)
+
+TILE_CACHE_DIR = Path(os.getenv('TILE_CACHE_DIR', os.path.join(PROJECT_ROOT, 'data', 'tiles')))
+
+MAX_ZOOM = 22
+
+# Tiles are cached on disk up to this zoom. Deeper tiles hold few points and
+# are cheap to build, while their number grows fourfold per level.
+TILE_CACHE_MAX_ZOOM = int(os.getenv('TILE_CACHE_MAX_ZOOM', 16))
+# Disk budget of each process's tile cache for one data version
+TILE_CACHE_MAX_BYTES = int(os.getenv('TILE_CACHE_MAX_MB', 512)) * 1024 * 1024
+
+# Points are clustered on tiles below this zoom
+CLUSTER_MAX_ZOOM = 14
+
+# Cluster cell size and tile buffer, in tile units (EXTENT per tile, i.e.
+# 16 units per pixel on 256px tiles)
+CLUSTER_RADIUS = 640
+TILE_BUFFER = 64
+
+def valid_tile(z, x, y):
+    """Whether z/x/y addresses an existing tile."""
+    return 0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+def _cluster(layer, indices, z, x, y):
+    """
+    Merge the points that fall in the same cluster cell. Cells are laid out on
+    a global pixel grid so a cluster looks the same on neighbouring tiles.
+    Single points keep their id and properties.
+    """
+    scale = (1 << z) * EXTENT
+    cell_x = np.floor(layer.x[indices] * scale / CLUSTER_RADIUS).astype(np.int64)
+    cell_y = np.floor(layer.y[indices] * scale / CLUSTER_RADIUS).astype(np.int64)
+    cells, inverse = np.unique(np.stack([cell_x, cell_y], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse, minlength=len(cells))
+    mean_x = np.bincount(inverse, weights=layer.x[indices], minlength=len(cells)) / counts
+    mean_y = np.bincount(inverse, weights=layer.y[indices], minlength=len(cells)) / counts
+    first = np.full(len(cells), -1, dtype=np.int64)
+    first[inverse[::-1]] = indices[::-1]
+
+    features = []
+    for i in range(len(cells)):
+        if counts[i] == 1:
+            features.append(_point_feature(layer, first[i], z, x, y))
+            continue
+        tile_x, tile_y = _tile_coordinates(mean_x[i], mean_y[i], z, x, y)
+        if _in_buffer(tile_x, tile_y):
+            features.append((None, tile_x, tile_y, {'cluster': True, 'point_count': int(counts[i])}))
+    return [feature for feature in features if feature is not None]
+
+def _tile_coordinates(world_x, world_y, z, x, y):
+    size = 1 << z
+    return int(round((world_x * size - x) * EXTENT)), int(round((world_y * size - y) * EXTENT))
+
+def _in_buffer(tile_x, tile_y):
+    return -TILE_BUFFER <= tile_x <= EXTENT + TILE_BUFFER and -TILE_BUFFER <= tile_y <= EXTENT + TILE_BUFFER
+
+def _point_feature(layer, index, z, x, y):
+    tile_x, tile_y = _tile_coordinates(layer.x[index], layer.y[index], z, x, y)
+    if not _in_buffer(tile_x, tile_y):
+        return None
+    properties = {key: values[index] for key, values in layer.properties.items()}
+    return int(layer.ids[index]), tile_x, tile_y, properties
+
+def tile_features(layer, z, x, y):
+    """Features of one layer on tile z/x/y, clustered below CLUSTER_MAX_ZOOM."""
+    size = 1 << z
+    clustering = z < CLUSTER_MAX_ZOOM
+    # Clusters near the edge need the points of the whole cell around them
+    margin = (TILE_BUFFER + (CLUSTER_RADIUS if clustering else 0)) / (size * EXTENT)
+    indices = layer.query(x / size - margin, y / size - margin, (x + 1) / size + margin, (y + 1) / size + margin)
+    if len(indices) == 0:
+        return []
+    if clustering:
+        return _cluster(layer, indices, z, x, y)
+    features = (_point_feature(layer, index, z, x, y) for index in indices)
+    return [feature for feature in features if feature is not None]
+
+class TileService:
+    """
+    Builds vector tiles from in-memory point layers and keeps the encoded tiles
+    in a disk cache. Layers and cached tiles belong to one data version; both
+    are dropped when the loaders bump it. Only non-empty tiles up to max_zoom
+    are cached, and caching stops once the version's tiles reach max_bytes.
+    """
+
+    def __init__(self, cache_dir=TILE_CACHE_DIR, check_interval=5.0,
+                 max_zoom=TILE_CACHE_MAX_ZOOM, max_bytes=TILE_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.versions = VersionTracker(check_interval)
+        self.max_zoom = max_zoom
+        self.max_bytes = max_bytes
+        self._version = None
+        self._layers = {}
+        # Size of the current version's cached tiles, counted on the first write
+        self._cached_bytes = None
+        self._lock = threading.Lock()
+
+    def _use_version(self, version):
+        """Switch to a data version key; the caller holds the lock."""
+        if version != self._version:
+            self._layers = {}
+            self._version = version
+            self._cached_bytes = None
+            self._remove_stale_versions(version)
+
+    def sync_version(self, db: Session):
+        """
+        Return the current data version key, dropping the layers and deleting
+        the cached tiles of every other version when it changed. The first
+        call in a process also clears tiles left on disk by earlier processes
+        or by a database that has since been recreated.
+        """
+        version = self.versions.current_key(db)
+        if version != self._version:
+            with self._lock:
+                self._use_version(version)
+        return version
+
+    def _layer(self, db: Session, name, version):
+        """Return the spatial index of a layer for the given data version key."""
+        with self._lock:
+            self._use_version(version)
+            if name not in self._layers:
+                self._layers[name] = PointLayer.load(db, name, version)
+            return self._layers[name]
+
+    def _remove_stale_versions(self, version):
+        """Delete tiles cached for other data version keys."""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.iterdir():
+            if path.is_dir() and path.name != str(version):
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed stale tile cache {path}")
+
+    def _cache_size(self, version):
+        """Total size of the tiles cached on disk for a data version key."""
+        total = 0
+        for root, _, files in os.walk(self.cache_dir / str(version)):
+            for filename in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, filename))
+                except OSError:
+                    pass
+        return total
+
+    def _reserve(self, version, size):
+        """Account for a tile about to be cached; False when it would exceed the budget."""
+        with self._lock:
+            if version != self._version:
+                return False
+            if self._cached_bytes is None:
+                self._cached_bytes = self._cache_size(version)
+            if self._cached_bytes + size > self.max_bytes:
+                return False
+            self._cached_bytes += size
+            return True
+
+    def tile_path(self, version, name, z, x, y):
+        return self.cache_dir / str(version) / name / str(z) / str(x) / f"{y}.pbf"
+
+    def get_tile(self, db: Session, name, z, x, y):
+        """
+        Return the encoded tile, from the disk cache when possible. Empty
+        tiles are returned as b'' and never cached.
+        """
+        if name not in POINT_LAYERS:
+            raise KeyError(name)
+        version = self.sync_version(db)
+        path = self.tile_path(version, name, z, x, y)
+        cacheable = z <= self.max_zoom
+        if cacheable:
+            try:
+                return path.read_bytes()
+            except FileNotFoundError:
+                pass
+
+        layer = self._layer(db, name, version)
+        data = encode_tile({name: tile_features(layer, z, x, y)})
+        if not data or not cacheable or not self._reserve(version, len(data)):
+            return data
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial tile
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache tile {path}: {e}")
+        return data
+
+tile_service = TileService()